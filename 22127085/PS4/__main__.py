@@ -0,0 +1,4 @@
+# Entry point of "python PS4 ..." and of the single-file build (build_zipapp.py)
+from source_code import main
+
+main()
@@ -0,0 +1,114 @@
+import heapq
+import itertools
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from preprocessing import negate_literal
+from clause_index import ClauseIndex, is_tautology
+
+Literals = FrozenSet[str]
+
+# Tag of the clauses derived from the KB alone, shared by every query
+SHARED = -1
+
+
+class BatchStats:
+    def __init__(self):
+        self.given = 0
+        self.shared = 0
+        self.per_query = 0
+        self.subsumed = 0
+
+    def __str__(self) -> str:
+        return (f"Batch saturation: {self.given} given clauses, {self.shared} shared, "
+                f"{self.per_query} query-specific, {self.subsumed} subsumed")
+
+
+class BatchResolution:
+    '''Answer many alpha queries against one KB in a single saturation.
+    -----------------------------------
+    Every clause carries a tag: SHARED if it was derived from the KB alone,
+    or the index q of the query whose NOT alpha it depends on. Two clauses
+    only resolve if their tags are compatible (SHARED with anything, q with
+    q), and the resolvent takes the more specific tag. A derivation of a
+    clause tagged q therefore only uses KB AND NOT alpha_q, while the KB x KB
+    resolvents are computed once for the whole batch.
+
+    The empty clause tagged q answers query q; tagged SHARED, it means the KB
+    is inconsistent and entails every alpha. Queries still open when the
+    clause set is saturated are not entailed.
+    '''
+
+    def __init__(self, kb_clauses: Iterable[Iterable[str]], alphas: List[Iterable[str]]):
+        self.alphas = [frozenset(alpha) for alpha in alphas]
+        self.verdicts: List[Optional[bool]] = [None] * len(self.alphas)
+        self.indexes: Dict[int, ClauseIndex] = {SHARED: ClauseIndex()}
+        self.heap: List[Tuple[int, int, int, Literals]] = []
+        self.counter = itertools.count()
+        self.stats = BatchStats()
+        for clause in kb_clauses:
+            self.push(frozenset(clause), SHARED)
+        for q, alpha in enumerate(self.alphas):
+            if is_tautology(alpha):
+                self.verdicts[q] = True
+                continue
+            self.indexes[q] = ClauseIndex()
+            for literal in sorted(alpha):
+                self.push(frozenset({negate_literal(literal)}), q)
+
+    def push(self, clause: Literals, tag: int):
+        if not is_tautology(clause):
+            heapq.heappush(self.heap, (len(clause), next(self.counter), tag, clause))
+
+    def open(self) -> bool:
+        return any(verdict is None for verdict in self.verdicts)
+
+    def redundant(self, clause: Literals, tag: int) -> bool:
+        if self.indexes[SHARED].subsumes(clause):
+            return True
+        return tag != SHARED and self.indexes[tag].subsumes(clause)
+
+    def add(self, clause: Literals, tag: int):
+        # A shared clause also makes the query-specific clauses it subsumes redundant
+        targets = list(self.indexes.values()) if tag == SHARED else [self.indexes[tag]]
+        for index in targets:
+            for other in index.subsumed_by(clause):
+                index.remove(other)
+                self.stats.subsumed += 1
+        self.indexes[tag].add(clause)
+        if tag == SHARED:
+            self.stats.shared += 1
+        else:
+            self.stats.per_query += 1
+
+    def close_query(self, q: int):
+        self.verdicts[q] = True
+        # Its clauses can no longer help any other query
+        del self.indexes[q]
+
+    def run(self) -> List[bool]:
+        while self.heap and self.open():
+            _, _, tag, given = heapq.heappop(self.heap)
+            if tag != SHARED and self.verdicts[tag] is not None:
+                continue
+            if not given:
+                if tag == SHARED:
+                    self.verdicts = [True] * len(self.verdicts)
+                    break
+                self.close_query(tag)
+                continue
+            if self.redundant(given, tag):
+                self.stats.subsumed += 1
+                continue
+            self.stats.given += 1
+            self.add(given, tag)
+            partners = self.indexes.items() if tag == SHARED else (
+                (SHARED, self.indexes[SHARED]), (tag, self.indexes[tag]))
+            for partner_tag, index in list(partners):
+                resolvent_tag = tag if tag != SHARED else partner_tag
+                for resolvent in index.resolvents(given):
+                    self.push(resolvent, resolvent_tag)
+        return [bool(verdict) for verdict in self.verdicts]
+
+
+def batch_entails(kb_clauses: Iterable[Iterable[str]], alphas: List[Iterable[str]]) -> List[bool]:
+    return BatchResolution(kb_clauses, alphas).run()
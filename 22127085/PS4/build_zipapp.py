@@ -0,0 +1,54 @@
+import argparse
+import os
+import py_compile
+import shutil
+import tempfile
+import zipapp
+
+PS4_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(PS4_DIR)
+
+
+def modules() -> list:
+    '''Source files of the resolver: the PS4 modules and the shared instrument.py.'''
+    files = [os.path.join(PS4_DIR, name) for name in sorted(os.listdir(PS4_DIR))
+             if name.endswith('.py') and name not in ('__main__.py', 'build_zipapp.py')]
+    return files + [os.path.join(PROJECT_DIR, 'instrument.py')]
+
+
+def build_zipapp(output_file: str, source: bool = False,
+                 interpreter: str = '/usr/bin/env python3') -> str:
+    '''Bundle the resolver into one executable file.
+    -----------------------------------
+    By default the archive holds compiled modules only. zipimport cannot
+    write bytecode caches, so shipping sources would recompile every module
+    on every start. The compiled archive only runs on the Python version
+    that built it; pass source=True for a portable one.
+    '''
+    with tempfile.TemporaryDirectory() as staging:
+        for file in modules():
+            name = os.path.basename(file)
+            if source:
+                shutil.copy(file, os.path.join(staging, name))
+            else:
+                py_compile.compile(file, cfile=os.path.join(staging, name + 'c'), doraise=True)
+        shutil.copy(os.path.join(PS4_DIR, '__main__.py'), os.path.join(staging, '__main__.py'))
+        zipapp.create_archive(staging, output_file, interpreter=interpreter)
+    return output_file
+
+
+def main():
+    '''Syntax: python build_zipapp.py [-o resolver.pyz] [--source]
+    Then: python resolver.pyz -i <input_file> -o <output_file>
+    '''
+    parser = argparse.ArgumentParser(description='Build the resolver as a single-file zipapp.')
+    parser.add_argument('-o', '--output_file', type=str, default='resolver.pyz',
+                        help='Path of the archive')
+    parser.add_argument('--source', action='store_true',
+                        help='Ship sources instead of bytecode (any Python 3 version)')
+    args = parser.parse_args()
+    print(f"Wrote {build_zipapp(args.output_file, args.source)}")
+
+
+if __name__ == '__main__':
+    main()
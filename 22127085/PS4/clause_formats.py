@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import mmap
+import struct
+import sys
+from array import array
+
+# typing is only needed by type checkers, see proof.py
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Dict, List, Sequence, Tuple
+
+    # Alpha and KB clauses as literal strings in the PS4 format ('A', '-A')
+    Problem = Tuple[List[str], List[List[str]]]
+
+BINARY_MAGIC = b'PS4C'
+BINARY_VERSION = 1
+# magic, version, variables, clauses, literals, alpha literals, names length
+BINARY_HEADER = struct.Struct('<4sIIQQIQ')
+
+
+class FormatError(ValueError):
+    pass
+
+
+def is_binary(file_path: str) -> bool:
+    with open(file_path, 'rb') as file:
+        return file.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def is_dimacs(file_path: str) -> bool:
+    '''By extension, or by a "p cnf" line after the leading comments. A PS4
+    text file can start like a comment (alpha "c OR d"), but its next line is
+    the clause count.'''
+    if file_path.endswith(('.cnf', '.dimacs')):
+        return True
+    with open(file_path, 'r') as file:
+        for line in file:
+            tokens = line.split()
+            if tokens and tokens[0] != 'c':
+                return tokens[:2] == ['p', 'cnf']
+    return False
+
+
+class VariableTable:
+    '''Numbering of variable names, DIMACS style (1, 2, ...).'''
+
+    def __init__(self, names: Sequence[str] = ()):
+        self.names: List[str] = list(names)
+        self.numbers: Dict[str, int] = {name: i + 1 for i, name in enumerate(self.names)}
+        # One shared string per literal of the initial names, so that decoding
+        # a clause allocates no strings; literals[-k] is '-' + names[k - 1]
+        self.literals = [''] + self.names + ['-' + name for name in reversed(self.names)]
+
+    def number(self, literal: str) -> int:
+        name = literal.lstrip('-')
+        if name not in self.numbers:
+            self.names.append(name)
+            self.numbers[name] = len(self.names)
+        number = self.numbers[name]
+        return -number if literal.startswith('-') else number
+
+    def literal(self, number: int) -> str:
+        return self.literals[number]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+def read_dimacs(file_path: str) -> Problem:
+    '''Read a DIMACS CNF file.
+    -----------------------------------
+    Optional comment lines name the variables and give alpha:
+        c var <number> <name>
+        c alpha <literal> ... 0
+    Unnamed variables are called X<number>.
+    '''
+    names: Dict[int, str] = {}
+    alpha_numbers: List[int] = []
+    clauses: List[List[int]] = []
+    current: List[int] = []
+    declared = None
+
+    def parse_number(token: str) -> int:
+        try:
+            return int(token)
+        except ValueError:
+            raise FormatError(f"Invalid number in {file_path}: {token}") from None
+
+    with open(file_path, 'r') as file:
+        for line in file:
+            tokens = line.split()
+            if not tokens:
+                continue
+            if tokens[0] == 'c':
+                if len(tokens) == 4 and tokens[1] == 'var':
+                    names[parse_number(tokens[2])] = tokens[3]
+                elif len(tokens) >= 2 and tokens[1] == 'alpha':
+                    alpha_numbers = [parse_number(token) for token in tokens[2:] if token != '0']
+                continue
+            if tokens[0] == 'p':
+                if len(tokens) != 4 or tokens[1] != 'cnf':
+                    raise FormatError(f"Invalid problem line in {file_path}: {line.strip()}")
+                declared = parse_number(tokens[3])
+                continue
+            for token in tokens:
+                value = parse_number(token)
+                if value == 0:
+                    clauses.append(current)
+                    current = []
+                else:
+                    current.append(value)
+    if current:
+        clauses.append(current)
+    if declared is not None and declared != len(clauses):
+        raise FormatError(f"Expected {declared} clauses in {file_path}, found {len(clauses)}")
+    if not alpha_numbers:
+        raise FormatError(f"No alpha in {file_path}: add a 'c alpha <literals> 0' line")
+
+    def literal(number: int) -> str:
+        name = names.get(abs(number), f"X{abs(number)}")
+        return '-' + name if number < 0 else name
+
+    alpha = [literal(number) for number in alpha_numbers]
+    return alpha, [[literal(number) for number in clause] for clause in clauses]
+
+
+def write_dimacs(file_path: str, alpha: Sequence[str], clauses: Sequence[Sequence[str]]):
+    variables = VariableTable()
+    numbered = [[variables.number(lit) for lit in clause] for clause in clauses]
+    alpha_numbers = [variables.number(lit) for lit in alpha]
+    with open(file_path, 'w') as file:
+        for i, name in enumerate(variables.names):
+            file.write(f"c var {i + 1} {name}\n")
+        file.write(f"c alpha {' '.join(map(str, alpha_numbers))} 0\n")
+        file.write(f"p cnf {len(variables)} {len(numbered)}\n")
+        for clause in numbered:
+            file.write(' '.join(map(str, clause)) + ' 0\n')
+
+
+def little_endian(values: array) -> array:
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def write_binary(file_path: str, alpha: Sequence[str], clauses: Sequence[Sequence[str]]):
+    '''Write the compact binary format.
+    -----------------------------------
+    Little-endian layout:
+    - header (BINARY_HEADER)
+    - variable names, utf-8, newline separated, padded to 8 bytes
+    - clause offsets: int64[clauses + 1] into the literal array
+    - literals: int32[literals], DIMACS numbering
+    - alpha: int32[alpha literals]
+    '''
+    variables = VariableTable()
+    offsets = array('q', [0])
+    literals = array('i')
+    for clause in clauses:
+        literals.extend(variables.number(lit) for lit in clause)
+        offsets.append(len(literals))
+    alpha_numbers = array('i', (variables.number(lit) for lit in alpha))
+    names = '\n'.join(variables.names).encode('utf-8')
+    with open(file_path, 'wb') as file:
+        file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(variables),
+                                      len(clauses), len(literals), len(alpha_numbers),
+                                      len(names)))
+        file.write(names)
+        file.write(b'\0' * (-file.tell() % 8))
+        for values in (offsets, literals, alpha_numbers):
+            little_endian(values).tofile(file)
+
+
+class BinaryClauses:
+    '''Memory-mapped view of a binary clause file.
+
+    offsets and literals are int views straight into the mapping; clause(i)
+    decodes one clause through the shared literal strings of the variable table.
+    '''
+
+    def __init__(self, file_path: str):
+        with open(file_path, 'rb') as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.buffer) < BINARY_HEADER.size:
+            raise FormatError(f"Truncated binary clause file: {file_path}")
+        (magic, version, num_variables, num_clauses, num_literals, num_alpha,
+         names_length) = BINARY_HEADER.unpack_from(self.buffer, 0)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            raise FormatError(f"Not a version {BINARY_VERSION} binary clause file: {file_path}")
+        offset = BINARY_HEADER.size
+        names = self.buffer[offset:offset + names_length].decode('utf-8')
+        self.variables = VariableTable(names.split('\n') if names else [])
+        if len(self.variables) != num_variables:
+            raise FormatError(f"Corrupt variable table: {file_path}")
+        offset += names_length
+        offset += -offset % 8
+        self.num_clauses = num_clauses
+        self.offsets = self.view(offset, 'q', num_clauses + 1)
+        offset += 8 * (num_clauses + 1)
+        self.literals = self.view(offset, 'i', num_literals)
+        offset += 4 * num_literals
+        self.alpha_numbers = self.view(offset, 'i', num_alpha)
+
+    def view(self, offset: int, typecode: str, count: int):
+        raw = memoryview(self.buffer)[offset:offset + struct.calcsize(typecode) * count]
+        if sys.byteorder == 'little':
+            return raw.cast(typecode)
+        values = array(typecode)
+        values.frombytes(raw)
+        values.byteswap()
+        return values
+
+    def __len__(self) -> int:
+        return self.num_clauses
+
+    def clause(self, i: int) -> List[str]:
+        literal = self.variables.literal
+        return [literal(number) for number in self.literals[self.offsets[i]:self.offsets[i + 1]]]
+
+    def alpha(self) -> List[str]:
+        return [self.variables.literal(number) for number in self.alpha_numbers]
+
+
+def read_binary(file_path: str) -> Problem:
+    clauses = BinaryClauses(file_path)
+    return clauses.alpha(), [clauses.clause(i) for i in range(len(clauses))]
@@ -0,0 +1,76 @@
+import heapq
+import itertools
+from typing import Dict, FrozenSet, Iterable, List, Set
+
+from preprocessing import negate_literal
+
+Literals = FrozenSet[str]
+
+
+def is_tautology(clause: Literals) -> bool:
+    return any(negate_literal(literal) in clause for literal in clause)
+
+
+class ClauseIndex:
+    '''Clause set with a literal occurrence index.'''
+
+    def __init__(self):
+        self.clauses: Set[Literals] = set()
+        self.occurs: Dict[str, Set[Literals]] = {}
+
+    def __len__(self) -> int:
+        return len(self.clauses)
+
+    def __contains__(self, clause: Literals) -> bool:
+        return clause in self.clauses
+
+    def add(self, clause: Literals):
+        self.clauses.add(clause)
+        for literal in clause:
+            self.occurs.setdefault(literal, set()).add(clause)
+
+    def remove(self, clause: Literals):
+        self.clauses.discard(clause)
+        for literal in clause:
+            self.occurs[literal].discard(clause)
+
+    def with_literal(self, literal: str) -> Set[Literals]:
+        return self.occurs.get(literal, set())
+
+    def subsumes(self, clause: Literals) -> bool:
+        # Any subsuming clause shares at least one literal with |clause|
+        return any(other <= clause
+                   for literal in clause for other in self.with_literal(literal))
+
+    def subsumed_by(self, clause: Literals) -> List[Literals]:
+        if not clause:
+            return list(self.clauses)
+        literal = min(clause, key=lambda lit: len(self.with_literal(lit)))
+        return [other for other in self.with_literal(literal) if clause <= other]
+
+    def resolvents(self, clause: Literals) -> Iterable[Literals]:
+        for literal in clause:
+            negated = negate_literal(literal)
+            for other in list(self.with_literal(negated)):
+                resolvent = (clause - {literal}) | (other - {negated})
+                if not is_tautology(resolvent):
+                    yield resolvent
+
+
+class ClauseQueue:
+    '''Shortest clause first, ties in insertion order.'''
+
+    def __init__(self, clauses: Iterable[Literals] = ()):
+        self.heap = []
+        self.counter = itertools.count()
+        self.extend(clauses)
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def extend(self, clauses: Iterable[Literals]):
+        for clause in clauses:
+            heapq.heappush(self.heap, (len(clause), next(self.counter), clause))
+
+    def pop(self) -> Literals:
+        return heapq.heappop(self.heap)[2]
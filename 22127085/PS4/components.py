@@ -0,0 +1,80 @@
+from typing import Dict, Iterable, List, Set
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent: Dict[str, str] = {}
+        self.size: Dict[str, int] = {}
+
+    def add(self, item: str):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+
+    def find(self, item: str) -> str:
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # Path compression
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a: str, b: str):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+
+
+def clause_variables(literals: Iterable[str]) -> Set[str]:
+    return {literal.lstrip('-') for literal in literals}
+
+
+class Decomposition:
+    def __init__(self, kept: List[int], pruned: List[int], components: int):
+        # Indices of the clauses connected to the query
+        self.kept = kept
+        # Indices of the clauses in variable-disjoint components
+        self.pruned = pruned
+        self.components = components
+
+    def __str__(self) -> str:
+        total = len(self.kept) + len(self.pruned)
+        return (f"Component decomposition kept {len(self.kept)}/{total} clauses "
+                f"({self.components} components, {len(self.pruned)} clauses pruned)")
+
+
+def decompose(clauses: List[Iterable[str]], query_variables: Iterable[str]) -> Decomposition:
+    '''Split the clauses into variable-disjoint components and keep only the
+    components that share a variable with the query.
+    -----------------------------------
+    A refutation of KB AND NOT alpha can only use clauses connected to NOT alpha,
+    as long as the KB itself is consistent. An inconsistent module that
+    does not mention alpha is therefore not detected once it is pruned.
+    '''
+    clause_vars = [clause_variables(clause) for clause in clauses]
+    components = UnionFind()
+    for variables in clause_vars:
+        first = None
+        for var in variables:
+            components.add(var)
+            if first is None:
+                first = var
+            else:
+                components.union(first, var)
+
+    query_roots = {components.find(var)
+                   for var in query_variables if var in components.parent}
+    kept, pruned = [], []
+    for i, variables in enumerate(clause_vars):
+        if any(components.find(var) in query_roots for var in variables):
+            kept.append(i)
+        else:
+            pruned.append(i)
+
+    roots = {components.find(var) for var in components.parent}
+    return Decomposition(kept, pruned, len(roots))
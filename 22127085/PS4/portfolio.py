@@ -0,0 +1,104 @@
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from typing import Callable, Dict, Optional
+
+# An engine takes no argument (bind the problem with functools.partial) and
+# returns whether KB entails alpha, or None if it gives up
+Engine = Callable[[], Optional[bool]]
+
+# How often the race checks for engines that died without an answer
+POLL_SECONDS = 0.05
+
+
+class PortfolioResult:
+    def __init__(self, verdict: Optional[bool], winner: Optional[str], seconds: float,
+                 engines: Dict[str, str]):
+        self.verdict = verdict
+        self.winner = winner
+        self.seconds = seconds
+        # Engine name => 'won', 'no verdict', 'failed: <error>', 'cancelled' or 'timeout'
+        self.engines = engines
+
+    def __str__(self) -> str:
+        if self.winner is None:
+            return f"Portfolio: no verdict after {self.seconds:.3f}s"
+        return f"Portfolio: {self.winner} won in {self.seconds:.3f}s"
+
+    def to_dict(self) -> Dict:
+        return {'verdict': self.verdict, 'winner': self.winner, 'seconds': self.seconds,
+                'engines': self.engines}
+
+
+def run_engine(name: str, engine: Engine, results):
+    # The engines print their traces, which nobody reads in a race
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        results.put((name, engine(), None))
+    except Exception as e:
+        results.put((name, None, f"{type(e).__name__}: {e}"))
+
+
+def race(engines: Dict[str, Engine], timeout: Optional[float] = None) -> PortfolioResult:
+    '''Run every engine in its own process and return the first verdict.
+    -----------------------------------
+    The other engines are terminated as soon as one of them answers. An
+    engine that fails or returns None leaves the race to the others; if none
+    of them answers (or |timeout| seconds pass), the verdict is None.
+    '''
+    context = multiprocessing.get_context()
+    results = context.Queue()
+    processes = {name: context.Process(target=run_engine, args=(name, engine, results), daemon=True)
+                 for name, engine in engines.items()}
+    status = {name: 'cancelled' for name in engines}
+    verdict, winner = None, None
+    # Forked children would flush our buffered output a second time
+    sys.stdout.flush()
+    start = time.perf_counter()
+    for process in processes.values():
+        process.start()
+    try:
+        pending = set(processes)
+        silent = set()
+        while pending and winner is None:
+            if timeout is not None and time.perf_counter() - start > timeout:
+                for name in pending:
+                    status[name] = 'timeout'
+                break
+            try:
+                name, answer, error = results.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                # An engine killed from outside never reports; one that just
+                # exited may still have its answer on the way, so it has one
+                # more poll to deliver it
+                dead = {name for name in pending if not processes[name].is_alive()}
+                for name in dead & silent:
+                    status[name] = f"failed: exit code {processes[name].exitcode}"
+                    pending.discard(name)
+                silent = dead
+                continue
+            pending.discard(name)
+            if error is not None:
+                status[name] = f"failed: {error}"
+            elif answer is None:
+                status[name] = 'no verdict'
+            else:
+                verdict, winner = answer, name
+                status[name] = 'won'
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in processes.values():
+            process.join()
+    return PortfolioResult(verdict, winner, time.perf_counter() - start, status)
+
+
+def record(result: PortfolioResult, file_path: str, problem: str):
+    '''Append |result| as one JSON line, to see later which engine wins on what.'''
+    entry = dict(result.to_dict(), problem=problem, date=time.strftime('%Y-%m-%dT%H:%M:%S'))
+    with open(file_path, 'a') as file:
+        file.write(json.dumps(entry) + '\n')
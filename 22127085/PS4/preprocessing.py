@@ -0,0 +1,210 @@
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+Literals = FrozenSet[str]
+# A resolvent and its two parents
+Derivation = Tuple[Literals, Literals, Literals]
+
+
+def negate_literal(literal: str) -> str:
+    return literal[1:] if literal.startswith('-') else '-' + literal
+
+
+def variable_of(literal: str) -> str:
+    return literal.lstrip('-')
+
+
+def count_variables(clauses: Iterable[Literals]) -> int:
+    return len({variable_of(lit) for clause in clauses for lit in clause})
+
+
+class PreprocessStats:
+    def __init__(self, clauses_before: int, variables_before: int):
+        self.clauses_before = clauses_before
+        self.variables_before = variables_before
+        self.clauses_after = clauses_before
+        self.variables_after = variables_before
+        self.duplicates = 0
+        self.tautologies = 0
+        self.units_propagated = 0
+        self.pure_literals = 0
+        self.subsumed = 0
+        self.eliminated_variables = 0
+
+    @property
+    def clauses_removed(self) -> int:
+        return self.clauses_before - self.clauses_after
+
+    @property
+    def variables_removed(self) -> int:
+        return self.variables_before - self.variables_after
+
+    def __str__(self) -> str:
+        return (f"Preprocessing removed {self.clauses_removed}/{self.clauses_before} clauses "
+                f"and {self.variables_removed}/{self.variables_before} variables "
+                f"(units: {self.units_propagated}, pure: {self.pure_literals}, "
+                f"subsumed: {self.subsumed}, duplicates: {self.duplicates}, "
+                f"tautologies: {self.tautologies}, "
+                f"eliminated: {self.eliminated_variables})")
+
+
+class PreprocessResult:
+    def __init__(self, clauses: List[Literals], conflict: bool, stats: PreprocessStats,
+                 derivations: List[Derivation]):
+        # Simplified clause set, equisatisfiable with the input
+        self.clauses = clauses
+        # True if the empty clause was derived during preprocessing
+        self.conflict = conflict
+        self.stats = stats
+        # Every clause not in the input, derived after its parents
+        self.derivations = derivations
+
+
+class Preprocessor:
+    '''Simplify a CNF clause set before resolution.
+    -----------------------------------
+    Every step preserves satisfiability, so refuting the simplified set
+    gives the same verdict as refuting the original one:
+    - duplicate and tautological clauses are dropped
+    - unit propagation
+    - pure literal elimination
+    - subsumed clauses are dropped
+    - bounded variable elimination (only when the clause count does not grow)
+    The other steps only drop clauses, while unit propagation and variable
+    elimination derive new ones by resolution: those are recorded with their
+    parents, so that a proof can start from the input clauses.
+    '''
+
+    def __init__(self, clauses: Iterable[Iterable[str]], max_resolvents: int = 64):
+        self.clauses = [frozenset(clause) for clause in clauses]
+        self.max_resolvents = max_resolvents
+        self.conflict = False
+        self.derivations: List[Derivation] = []
+        self.stats = PreprocessStats(
+            len(self.clauses), count_variables(self.clauses))
+
+    def run(self) -> PreprocessResult:
+        self.remove_duplicates()
+        changed = True
+        while changed and not self.conflict:
+            changed = (self.propagate_units()
+                       or self.eliminate_pure_literals()
+                       or self.remove_subsumed()
+                       or self.eliminate_variables())
+
+        if self.conflict:
+            self.clauses = [frozenset()]
+        self.stats.clauses_after = len(self.clauses)
+        self.stats.variables_after = count_variables(self.clauses)
+        return PreprocessResult(self.clauses, self.conflict, self.stats, self.derivations)
+
+    def remove_duplicates(self):
+        seen = set()
+        kept = []
+        for clause in self.clauses:
+            if any(negate_literal(lit) in clause for lit in clause):
+                self.stats.tautologies += 1
+            elif clause in seen:
+                self.stats.duplicates += 1
+            else:
+                seen.add(clause)
+                kept.append(clause)
+        self.clauses = kept
+        if frozenset() in seen:
+            self.conflict = True
+
+    def propagate_units(self) -> bool:
+        changed = False
+        while True:
+            unit = next((clause for clause in self.clauses if len(clause) == 1), None)
+            if unit is None:
+                return changed
+            (literal,) = unit
+            negated = negate_literal(literal)
+            kept = []
+            for clause in self.clauses:
+                if literal in clause:
+                    continue
+                if negated in clause:
+                    parent = clause
+                    clause = clause - {negated}
+                    self.derivations.append((clause, parent, unit))
+                    if not clause:
+                        self.conflict = True
+                        return True
+                kept.append(clause)
+            self.clauses = kept
+            self.stats.units_propagated += 1
+            changed = True
+
+    def eliminate_pure_literals(self) -> bool:
+        literals = {lit for clause in self.clauses for lit in clause}
+        pure = {lit for lit in literals if negate_literal(lit) not in literals}
+        if not pure:
+            return False
+        self.clauses = [clause for clause in self.clauses if not (clause & pure)]
+        self.stats.pure_literals += len(pure)
+        return True
+
+    def remove_subsumed(self) -> bool:
+        # Smaller clauses can only subsume larger ones, so visit them first
+        # and look candidates up through the literal occurrence lists.
+        occurs: Dict[str, List[Literals]] = {}
+        kept = []
+        for clause in sorted(set(self.clauses), key=len):
+            candidates = {other for lit in clause for other in occurs.get(lit, [])}
+            if any(other <= clause for other in candidates):
+                continue
+            kept.append(clause)
+            for lit in clause:
+                occurs.setdefault(lit, []).append(clause)
+        removed = len(self.clauses) - len(kept)
+        if not removed:
+            return False
+        self.clauses = kept
+        self.stats.subsumed += removed
+        return True
+
+    def eliminate_variables(self) -> bool:
+        # Try the least frequent variables first: they are the cheapest to
+        # eliminate and the most likely to keep the clause count bounded.
+        counts: Dict[str, int] = {}
+        for clause in self.clauses:
+            for lit in clause:
+                counts[variable_of(lit)] = counts.get(variable_of(lit), 0) + 1
+        for var in sorted(counts, key=lambda v: (counts[v], v)):
+            resolvents = self.eliminate(var)
+            if resolvents is not None:
+                self.stats.eliminated_variables += 1
+                return True
+        return False
+
+    def eliminate(self, var: str) -> Optional[Set[Literals]]:
+        negated = '-' + var
+        positive = [clause for clause in self.clauses if var in clause]
+        negative = [clause for clause in self.clauses if negated in clause]
+        if len(positive) * len(negative) > self.max_resolvents:
+            return None
+
+        parents: Dict[Literals, Tuple[Literals, Literals]] = {}
+        for pos in positive:
+            for neg in negative:
+                resolvent = (pos - {var}) | (neg - {negated})
+                if any(negate_literal(lit) in resolvent for lit in resolvent):
+                    continue
+                parents.setdefault(resolvent, (pos, neg))
+        resolvents: Set[Literals] = set(parents)
+        if len(resolvents) > len(positive) + len(negative):
+            return None
+        self.derivations.extend((resolvent, *parents[resolvent])
+                                for resolvent in sorted(resolvents, key=sorted))
+
+        rest = [clause for clause in self.clauses
+                if var not in clause and negated not in clause]
+        self.clauses = rest + sorted(resolvents, key=sorted)
+        if frozenset() in resolvents:
+            self.conflict = True
+        return resolvents
+
+
+def preprocess(clauses: Iterable[Iterable[str]]) -> PreprocessResult:
+    return Preprocessor(clauses).run()
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from array import array
+
+# typing is only needed by type checkers, the resolver imports this module on every start
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Dict, FrozenSet, Iterable, List, Optional
+
+    Literals = FrozenSet[str]
+
+NO_PARENT = -1
+
+# TSTP roles of the input clauses
+AXIOM = 'axiom'
+NEGATED_CONJECTURE = 'negated_conjecture'
+
+
+class ProofDAG:
+    '''Resolution proof stored as a DAG of clause IDs.
+    -----------------------------------
+    Each clause is stored once, with the IDs of its two parents (NO_PARENT
+    for input clauses) in two flat int arrays. Parents always have smaller
+    IDs than their children, so ID order is a topological order.
+    '''
+
+    def __init__(self):
+        self.clauses: List[Literals] = []
+        self.ids: Dict[Literals, int] = {}
+        self.parent1 = array('l')
+        self.parent2 = array('l')
+        self.roles: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.clauses)
+
+    def add(self, literals: Iterable[str], parent1: int = NO_PARENT, parent2: int = NO_PARENT) -> int:
+        '''Return the ID of the clause, adding it if it is new (the first derivation is kept).'''
+        literals = frozenset(literals)
+        clause_id = self.ids.get(literals)
+        if clause_id is not None:
+            return clause_id
+        clause_id = len(self.clauses)
+        self.clauses.append(literals)
+        self.ids[literals] = clause_id
+        self.parent1.append(parent1)
+        self.parent2.append(parent2)
+        return clause_id
+
+    def add_input(self, literals: Iterable[str], role: str = AXIOM) -> int:
+        clause_id = self.add(literals)
+        self.roles.setdefault(clause_id, role)
+        return clause_id
+
+    def id_of(self, literals: Iterable[str]) -> int:
+        return self.ids[frozenset(literals)]
+
+    def is_input(self, clause_id: int) -> bool:
+        return self.parent1[clause_id] == NO_PARENT
+
+    def empty_clause(self) -> Optional[int]:
+        return self.ids.get(frozenset())
+
+    def extract(self, goal: int) -> List[int]:
+        '''Return the IDs of the clauses used to derive |goal|, in topological order.'''
+        used = set()
+        stack = [goal]
+        while stack:
+            clause_id = stack.pop()
+            if clause_id in used:
+                continue
+            used.add(clause_id)
+            if not self.is_input(clause_id):
+                stack.append(self.parent1[clause_id])
+                stack.append(self.parent2[clause_id])
+        return sorted(used)
+
+    def minimal_proof(self) -> List[int]:
+        '''Clauses used in the refutation, or [] if the empty clause was not derived.'''
+        goal = self.empty_clause()
+        return [] if goal is None else self.extract(goal)
+
+    def to_tstp(self, ids: Iterable[int]) -> str:
+        def formula(literals: Literals) -> str:
+            if not literals:
+                return '$false'
+            return ' | '.join(('~' + lit[1:].lower()) if lit.startswith('-') else lit.lower()
+                              for lit in sorted(literals, key=lambda lit: lit.lstrip('-')))
+
+        lines = []
+        for clause_id in ids:
+            literals = self.clauses[clause_id]
+            if self.is_input(clause_id):
+                lines.append(f"cnf(c{clause_id}, {self.roles.get(clause_id, AXIOM)}, ({formula(literals)})).")
+            else:
+                lines.append(f"cnf(c{clause_id}, plain, ({formula(literals)}), "
+                             f"inference(resolution, [status(thm)], "
+                             f"[c{self.parent1[clause_id]}, c{self.parent2[clause_id]}])).")
+        return '\n'.join(lines) + '\n'
+
+    def to_dimacs(self, ids: Iterable[int]) -> str:
+        '''Input clauses of |ids| in DIMACS CNF, numbered like to_lrat().'''
+        inputs = [i for i in ids if self.is_input(i)]
+        variables = self.variable_numbers()
+        lines = [f"c {number} {name}" for name, number in sorted(variables.items(), key=lambda item: item[1])]
+        lines.append(f"p cnf {len(variables)} {len(inputs)}")
+        lines.extend(self.dimacs_clause(i, variables) + ' 0' for i in inputs)
+        return '\n'.join(lines) + '\n'
+
+    def to_lrat(self, ids: Iterable[int]) -> str:
+        '''Derived clauses of |ids| in LRAT, against the CNF written by to_dimacs().
+
+        The two parents of a resolvent are valid unit propagation hints.
+        '''
+        ids = list(ids)
+        variables = self.variable_numbers()
+        numbers = {}
+        for i in ids:
+            if self.is_input(i):
+                numbers[i] = len(numbers) + 1
+        lines = []
+        for i in ids:
+            if self.is_input(i):
+                continue
+            numbers[i] = len(numbers) + 1
+            clause = self.dimacs_clause(i, variables)
+            hints = f"{numbers[self.parent1[i]]} {numbers[self.parent2[i]]}"
+            lines.append(f"{numbers[i]} {clause + ' ' if clause else ''}0 {hints} 0")
+        return '\n'.join(lines) + '\n'
+
+    def variable_numbers(self) -> Dict[str, int]:
+        names = sorted({lit.lstrip('-') for clause in self.clauses for lit in clause})
+        return {name: i + 1 for i, name in enumerate(names)}
+
+    def dimacs_clause(self, clause_id: int, variables: Dict[str, int]) -> str:
+        literals = sorted(self.clauses[clause_id], key=lambda lit: variables[lit.lstrip('-')])
+        return ' '.join(('-' if lit.startswith('-') else '') + str(variables[lit.lstrip('-')])
+                        for lit in literals)
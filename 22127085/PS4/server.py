@@ -0,0 +1,140 @@
+import asyncio
+import sys
+from typing import Callable, Dict, FrozenSet, Iterable, Optional
+
+from clause_index import ClauseIndex, ClauseQueue, is_tautology
+from preprocessing import negate_literal
+
+Literals = FrozenSet[str]
+
+
+class WarmKnowledgeBase:
+    '''A KB that is loaded once and answers many alpha queries.
+    -----------------------------------
+    On load the KB is saturated under resolution with subsumption, within
+    |max_clauses|. A saturated, subsumption-reduced clause set holds the
+    prime implicates of the KB, so KB entails alpha exactly when one of them
+    subsumes alpha, and each query is a few index lookups.
+
+    If saturation does not fit the budget, queries fall back to set-of-support
+    resolution rooted at NOT alpha. This assumes the KB is consistent. Every
+    alpha proven this way is kept as a lemma for the next queries.
+    '''
+
+    def __init__(self, clauses: Iterable[Iterable[str]], max_clauses: int = 20000,
+                 saturate: bool = True):
+        self.max_clauses = max_clauses
+        self.kb = ClauseIndex()
+        for clause in clauses:
+            clause = frozenset(clause)
+            if not is_tautology(clause):
+                self.kb.add(clause)
+        self.answers: Dict[Literals, bool] = {}
+        self.inconsistent = False
+        self.implicates = self.saturate() if saturate else None
+
+    @classmethod
+    def restore(cls, clauses: Iterable[Iterable[str]], implicates: Optional[Iterable[Literals]],
+                inconsistent: bool, max_clauses: int) -> 'WarmKnowledgeBase':
+        '''Rebuild a saved KB without saturating it again, see snapshot.py.'''
+        kb = cls(clauses, max_clauses, saturate=False)
+        kb.inconsistent = inconsistent
+        if implicates is not None:
+            kb.implicates = ClauseIndex()
+            for clause in implicates:
+                kb.implicates.add(clause)
+        return kb
+
+    def saturate(self) -> Optional[ClauseIndex]:
+        processed = ClauseIndex()
+        unprocessed = ClauseQueue(sorted(self.kb.clauses, key=sorted))
+        while unprocessed:
+            given = unprocessed.pop()
+            if not given:
+                self.inconsistent = True
+                return processed
+            if processed.subsumes(given):
+                continue
+            for other in processed.subsumed_by(given):
+                processed.remove(other)
+            processed.add(given)
+            if len(processed) + len(unprocessed) > self.max_clauses:
+                return None
+            unprocessed.extend(processed.resolvents(given))
+        return processed
+
+    def ask(self, alpha: Iterable[str]) -> bool:
+        alpha = frozenset(alpha)
+        if alpha not in self.answers:
+            self.answers[alpha] = self.entails(alpha)
+        return self.answers[alpha]
+
+    def entails(self, alpha: Literals) -> bool:
+        if self.inconsistent or is_tautology(alpha):
+            return True
+        if self.implicates is not None:
+            return self.implicates.subsumes(alpha)
+        entails = self.set_of_support(alpha)
+        if entails:
+            self.kb.add(alpha)
+        return entails
+
+    def set_of_support(self, alpha: Literals) -> bool:
+        support = ClauseIndex()
+        unprocessed = ClauseQueue(frozenset({negate_literal(literal)}) for literal in sorted(alpha))
+        while unprocessed:
+            given = unprocessed.pop()
+            if not given:
+                return True
+            if support.subsumes(given):
+                continue
+            support.add(given)
+            unprocessed.extend(self.kb.resolvents(given))
+            unprocessed.extend(support.resolvents(given))
+        return False
+
+
+Parser = Callable[[str], Iterable[str]]
+
+
+def answer(kb: WarmKnowledgeBase, line: str, parse_query: Parser) -> Optional[str]:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return "YES" if kb.ask(parse_query(line)) else "NO"
+    except Exception as e:
+        return f"ERROR {e}"
+
+
+def serve_stdin(kb: WarmKnowledgeBase, parse_query: Parser):
+    '''Line protocol: one alpha per line on stdin, one YES/NO per line on stdout.'''
+    for line in sys.stdin:
+        if line.strip() == 'quit':
+            break
+        response = answer(kb, line, parse_query)
+        if response is not None:
+            print(response, flush=True)
+
+
+async def handle_client(kb: WarmKnowledgeBase, parse_query: Parser,
+                        reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    while True:
+        line = await reader.readline()
+        if not line or line.strip() == b'quit':
+            break
+        response = answer(kb, line.decode(), parse_query)
+        if response is not None:
+            writer.write((response + '\n').encode())
+            await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+async def serve_socket(kb: WarmKnowledgeBase, parse_query: Parser, host: str, port: int):
+    '''Same line protocol as serve_stdin, one session per TCP connection.'''
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_client(kb, parse_query, reader, writer), host, port)
+    print(f"Serving on {host}:{port}", flush=True)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,152 @@
+import hashlib
+import mmap
+import struct
+import sys
+from array import array
+from typing import FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from clause_formats import FormatError, VariableTable
+from server import WarmKnowledgeBase
+
+Literals = FrozenSet[str]
+
+SNAPSHOT_MAGIC = b'PS4S'
+SNAPSHOT_VERSION = 2
+# magic, version, flags, max clauses, digest of the input clauses
+SNAPSHOT_HEADER = struct.Struct('<4sIIQ32s')
+SEGMENT_MAGIC = b'SEGM'
+# magic, new variables, names length, KB clauses, implicates, literal stream length
+SEGMENT_HEADER = struct.Struct('<4sIIIIQ')
+
+INCONSISTENT = 1
+SATURATED = 2
+
+
+class StaleSnapshotError(FormatError):
+    '''The snapshot was not saved from the same input clauses (or is too old to tell).'''
+
+
+def clause_digest(clauses: Iterable[Iterable[str]]) -> bytes:
+    '''SHA-256 of a clause set, independent of the clause and literal order.'''
+    lines = sorted({' '.join(sorted(clause)) for clause in clauses})
+    return hashlib.sha256('\n'.join(lines).encode('utf-8')).digest()
+
+
+class KBSnapshot:
+    '''Snapshot of a saturated WarmKnowledgeBase, so that a restart skips the
+    saturation.
+    -----------------------------------
+    Little-endian layout:
+    - header (SNAPSHOT_HEADER): INCONSISTENT and SATURATED flags, max_clauses,
+      clause_digest() of the input clauses the KB was built from
+    - one or more segments, written by create() then append():
+      - header (SEGMENT_HEADER)
+      - names of the variables new in this segment, utf-8, newline separated,
+        padded to 4 bytes
+      - int32 literal stream, DIMACS numbering, every clause ended by 0: the new
+        KB clauses, then (first segment only) the prime implicates
+    The variable table is shared by all the segments, so a literal is stored
+    once as a name and then as a number. Later segments only hold the lemmas
+    that set-of-support queries added to the KB since the previous save.
+    '''
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.variables = VariableTable()
+        self.saved: Set[Literals] = set()
+
+    @classmethod
+    def create(cls, kb: WarmKnowledgeBase, file_path: str, digest: bytes) -> 'KBSnapshot':
+        snapshot = cls(file_path)
+        flags = (INCONSISTENT if kb.inconsistent else 0) | (
+            SATURATED if kb.implicates is not None else 0)
+        with open(file_path, 'wb') as file:
+            file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, flags, kb.max_clauses,
+                                            digest))
+        implicates = kb.implicates.clauses if kb.implicates is not None else ()
+        snapshot.write_segment(kb.kb.clauses, implicates)
+        return snapshot
+
+    @classmethod
+    def load(cls, file_path: str, digest: Optional[bytes] = None) -> Tuple['KBSnapshot', WarmKnowledgeBase]:
+        '''Read the snapshot at |file_path|. With |digest| (see clause_digest), a
+        snapshot saved from other input clauses raises StaleSnapshotError.'''
+        snapshot = cls(file_path)
+        with open(file_path, 'rb') as file:
+            if file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise FormatError(f"Not a KB snapshot: {file_path}")
+            if file.seek(0, 2) < SNAPSHOT_HEADER.size:
+                raise StaleSnapshotError(f"Not a version {SNAPSHOT_VERSION} KB snapshot: {file_path}")
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        _, version, flags, max_clauses, saved_digest = SNAPSHOT_HEADER.unpack_from(buffer, 0)
+        if version != SNAPSHOT_VERSION:
+            raise StaleSnapshotError(f"Not a version {SNAPSHOT_VERSION} KB snapshot: {file_path}")
+        if digest is not None and digest != saved_digest:
+            raise StaleSnapshotError(f"KB snapshot of other input clauses: {file_path}")
+        implicates: List[Literals] = []
+        offset = SNAPSHOT_HEADER.size
+        while offset < len(buffer):
+            if offset + SEGMENT_HEADER.size > len(buffer):
+                raise FormatError(f"Truncated KB snapshot: {file_path}")
+            (magic, num_names, names_length, num_clauses, num_implicates,
+             num_ints) = SEGMENT_HEADER.unpack_from(buffer, offset)
+            offset += SEGMENT_HEADER.size
+            end = offset + names_length + (-names_length % 4) + 4 * num_ints
+            if magic != SEGMENT_MAGIC or end > len(buffer):
+                raise FormatError(f"Truncated KB snapshot: {file_path}")
+            names = buffer[offset:offset + names_length].decode('utf-8')
+            for name in (names.split('\n') if num_names else []):
+                snapshot.variables.number(name)
+            offset += names_length + (-names_length % 4)
+            clauses = snapshot.decode(memoryview(buffer)[offset:end])
+            if len(clauses) != num_clauses + num_implicates:
+                raise FormatError(f"Corrupt KB snapshot: {file_path}")
+            snapshot.saved.update(clauses[:num_clauses])
+            implicates.extend(clauses[num_clauses:])
+            offset = end
+        kb = WarmKnowledgeBase.restore(snapshot.saved, implicates if flags & SATURATED else None,
+                                       bool(flags & INCONSISTENT), max_clauses)
+        return snapshot, kb
+
+    def decode(self, raw: memoryview) -> List[Literals]:
+        numbers = raw.cast('i')
+        if sys.byteorder != 'little':
+            numbers = array('i', numbers)
+            numbers.byteswap()
+        names = self.variables.names
+        clauses = []
+        current: List[str] = []
+        for number in numbers:
+            if number == 0:
+                clauses.append(frozenset(current))
+                current = []
+            else:
+                name = names[abs(number) - 1]
+                current.append('-' + name if number < 0 else name)
+        return clauses
+
+    def append(self, kb: WarmKnowledgeBase) -> int:
+        '''Add the KB clauses that are not saved yet, return how many.'''
+        new = kb.kb.clauses - self.saved
+        if new:
+            self.write_segment(new, ())
+        return len(new)
+
+    def write_segment(self, clauses, implicates):
+        clauses = sorted(clauses, key=sorted)
+        implicates = sorted(implicates, key=sorted)
+        num_names = len(self.variables)
+        numbers = array('i')
+        for clause in clauses + implicates:
+            numbers.extend(self.variables.number(literal) for literal in sorted(clause))
+            numbers.append(0)
+        names = '\n'.join(self.variables.names[num_names:]).encode('utf-8')
+        with open(self.file_path, 'ab') as file:
+            file.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, len(self.variables) - num_names,
+                                           len(names), len(clauses), len(implicates), len(numbers)))
+            file.write(names)
+            file.write(b'\0' * (-len(names) % 4))
+            if sys.byteorder != 'little':
+                numbers.byteswap()
+            numbers.tofile(file)
+        self.saved.update(clauses)
@@ -1,6 +1,25 @@
-import argparse
-from typing import List, Tuple, Set
+from __future__ import annotations
+
 import os
+import sys
+from types import SimpleNamespace
+
+import clause_formats
+from proof import AXIOM, NEGATED_CONJECTURE, ProofDAG
+
+# The resolver is started once per query, so only what a plain -i/-o run
+# needs is imported here: argparse, typing and the optional helpers
+# (batch, components, preprocessing, gzip) are imported where they are used.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import argparse
+    from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# instrument.py is shared with logic.py, one folder up
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.append(PROJECT_DIR)
+from instrument import STATS, profiled
 
 
 class Clause:
@@ -32,11 +51,15 @@ class Clause:
                 new_literals = (
                     self.literals - {literal}) | (other.literals - {negated_literal})
                 new_clause = Clause(new_literals)
+                if STATS.enabled:
+                    STATS.counters['resolvents_generated'] += 1
                 if not new_clause.contains_tautology():
                     resolvents.append(new_clause)
                     # Immediately return if an empty clause is found
                     if not new_clause.literals:
                         return [new_clause]  # Return only the empty clause
+                elif STATS.enabled:
+                    STATS.counters['dropped_tautology'] += 1
         return resolvents
 
     def contains_tautology(self) -> bool:
@@ -57,14 +80,22 @@ class Clause:
 
 
 class KnowledgeBase:
-    def __init__(self):
+    def __init__(self, loop_trace: bool = False):
         self.clauses = []
         self.loop_count = 0
+        # The trace printed after every loop lists all the resolutions so far,
+        # or with |loop_trace| only those of the loop (much shorter output)
+        self.loop_trace = loop_trace
+        # Every kept clause with the IDs of its parents, see proof.py
+        self.proof = ProofDAG()
 
     def add_clause(self, clause: Clause):
         self.clauses.append(clause)
 
-    def pl_resolution(self, alpha: Clause) -> Tuple[List[List[Clause]], bool]:
+    def pl_resolution(self, alpha: Clause, preprocess: bool = False, decompose: bool = False,
+                      on_step: Callable[[List[Clause]], None] = None) -> Tuple[List[List[Clause]], bool]:
+        '''Resolution loop. Each loop's new clauses are passed to |on_step| as
+        soon as the loop finishes; by default they are collected and returned.'''
         negated_alpha_clauses = alpha.negate()
         for negated_clause in negated_alpha_clauses:
             self.add_clause(negated_clause)
@@ -73,39 +104,121 @@ class KnowledgeBase:
         self.print_kb()
 
         all_clauses = self.clauses.copy()
+        if decompose:
+            all_clauses = self.decompose(all_clauses, alpha)
+        self.start_proof(all_clauses, negated_alpha_clauses)
+        if preprocess:
+            all_clauses = self.preprocess(all_clauses)
         all_steps = []
-        all_resolutions = []
+        emit = on_step or all_steps.append
+        if any(not clause.literals for clause in all_clauses):
+            emit([Clause(set())])
+            return all_steps, True, None, None
 
+        resolutions = []
         while True:
             self.loop_count += 1
             pairs = [(ci, cj) for i, ci in enumerate(all_clauses)
                      for j, cj in enumerate(all_clauses) if i < j]
             step_clauses = []
+            if self.loop_trace:
+                resolutions = []
+            STATS.count('loops')
+            STATS.count('pairs_tried', len(pairs))
 
             for (clause1, clause2) in pairs:
                 resolvents = clause1.resolve(clause2)
                 for resolvent in resolvents:
-                    all_resolutions.append((clause1, clause2, resolvent))
+                    resolutions.append((clause1, clause2, resolvent))
                     if not resolvent.literals:
+                        STATS.count('resolvents_kept')
                         step_clauses.append(resolvent)
-                        all_steps.append(list(step_clauses))
-                        self.print_resolutions(all_resolutions)
+                        emit(list(step_clauses))
+                        self.record_resolvent(clause1, clause2, resolvent)
+                        self.print_resolutions(resolutions)
                         return all_steps, True, clause1, clause2  # Return the conflicting clauses
                     if resolvent not in all_clauses and resolvent not in step_clauses:
                         step_clauses.append(resolvent)
+                        self.record_resolvent(clause1, clause2, resolvent)
+                    elif STATS.enabled:
+                        STATS.counters['dropped_duplicate'] += 1
 
             if not step_clauses:
                 if step_clauses:
-                    all_steps.append(step_clauses)
-                all_steps.append([])
-                self.print_resolutions(all_resolutions)
+                    emit(step_clauses)
+                emit([])
+                self.print_resolutions(resolutions)
                 return all_steps, False, None, None
 
             step_clauses = sorted(set(step_clauses), key=lambda c: sorted(
                 c.literals, key=lambda lit: lit.lstrip('-')))
-            all_steps.append(step_clauses)
+            STATS.count('resolvents_kept', len(step_clauses))
+            emit(step_clauses)
             all_clauses.extend(step_clauses)
-            self.print_resolutions(all_resolutions)
+            self.print_resolutions(resolutions)
+
+    def ask_batch(self, alphas: List[Clause]) -> List[bool]:
+        '''Check KB entails alpha for every alpha, sharing the KB-only resolvents.
+        Unlike pl_resolution, the KB is left unchanged.'''
+        from batch import BatchResolution
+        batch = BatchResolution((clause.literals for clause in self.clauses),
+                                [alpha.literals for alpha in alphas])
+        with STATS.timer('batch_resolution'):
+            verdicts = batch.run()
+        STATS.count('batch_queries', len(alphas))
+        STATS.count('dropped_subsumed', batch.stats.subsumed)
+        print(batch.stats)
+        return verdicts
+
+    def start_proof(self, clauses: List[Clause], negated_alpha_clauses: List[Clause]):
+        self.proof = ProofDAG()
+        negated = {frozenset(clause.literals) for clause in negated_alpha_clauses}
+        for clause in clauses:
+            literals = frozenset(clause.literals)
+            self.proof.add_input(literals, NEGATED_CONJECTURE if literals in negated else AXIOM)
+
+    def record_resolvent(self, clause1: Clause, clause2: Clause, resolvent: Clause):
+        self.proof.add(resolvent.literals,
+                       self.proof.id_of(clause1.literals), self.proof.id_of(clause2.literals))
+
+    def write_proof(self, file_path: str, proof_format: str = 'tstp') -> bool:
+        '''Write the clauses used to derive {} to |file_path|, if {} was derived.'''
+        ids = self.proof.minimal_proof()
+        if not ids:
+            return False
+        with open(file_path, 'w') as file:
+            if proof_format == 'lrat':
+                file.write(self.proof.to_lrat(ids))
+            else:
+                file.write(self.proof.to_tstp(ids))
+        if proof_format == 'lrat':
+            with open(file_path + '.cnf', 'w') as file:
+                file.write(self.proof.to_dimacs(ids))
+        return True
+
+    def decompose(self, clauses: List[Clause], alpha: Clause) -> List[Clause]:
+        import components
+        query_variables = {literal.lstrip('-') for literal in alpha.literals}
+        with STATS.timer('decompose'):
+            decomposition = components.decompose([clause.literals for clause in clauses], query_variables)
+        STATS.count('dropped_component', len(decomposition.pruned))
+        print(decomposition)
+        for i in decomposition.pruned:
+            print(f"Pruned: {clauses[i]}")
+        print("------")
+        return [clauses[i] for i in decomposition.kept]
+
+    def preprocess(self, clauses: List[Clause]) -> List[Clause]:
+        from preprocessing import Preprocessor
+        with STATS.timer('preprocess'):
+            result = Preprocessor(clause.literals for clause in clauses).run()
+        STATS.count('dropped_subsumed', result.stats.subsumed)
+        # Clauses derived by preprocessing are resolvents of the input ones
+        for resolvent, parent1, parent2 in result.derivations:
+            self.proof.add(resolvent, self.proof.id_of(parent1), self.proof.id_of(parent2))
+        print(result.stats)
+        print("------")
+        return [Clause(set(literals)) for literals in result.clauses]
 
     def print_kb(self):
         if not self.clauses:
@@ -117,24 +230,25 @@ class KnowledgeBase:
         print("------")
 
     def print_resolutions(self, resolutions):
-        print(f"Loop {self.loop_count}:")
-        if not resolutions:
-            print("No resolutions in this loop.")
-        for (clause1, clause2, resolvent) in resolutions:
-            print(f"Resolving: {clause1} with {clause2}")
-            print(f"Result: {resolvent}")
-        print("------")
+        with STATS.timer('print_resolutions'):
+            print(f"Loop {self.loop_count}:")
+            if not resolutions:
+                print("No resolutions in this loop.")
+            for (clause1, clause2, resolvent) in resolutions:
+                print(f"Resolving: {clause1} with {clause2}")
+                print(f"Result: {resolvent}")
+            print("------")
+
+
+def output_sort_key(clause: Clause) -> tuple:
+    return len(clause.literals), [lit.lstrip('-') for lit in sorted(clause.literals)]
 
 
 def format_output(all_steps: List[List[Clause]], entails: bool, conflict_clauses: Tuple[Clause, Clause]) -> str:
     output_lines = []
 
-    def clause_sort_key(clause: Clause) -> list:
-        return [lit.lstrip('-') for lit in sorted(clause.literals)]
-
     for step in all_steps:
-        unique_clauses = sorted(set(step), key=lambda c: (
-            len(c.literals), clause_sort_key(c)))
+        unique_clauses = sorted(set(step), key=output_sort_key)
         output_lines.append(str(len(unique_clauses)))
         output_lines.extend(str(clause) for clause in unique_clauses)
 
@@ -143,6 +257,43 @@ def format_output(all_steps: List[List[Clause]], entails: bool, conflict_clauses
     return '\n'.join(output_lines)
 
 
+class OutputWriter:
+    '''Write the output file one loop at a time, in the format of format_output.'''
+
+    def __init__(self, file_path: str, compress: bool = False, buffer_size: int = 1 << 16):
+        if compress:
+            import gzip
+            self.file = gzip.open(file_path, 'wt', encoding='utf-8')
+        else:
+            self.file = open(file_path, 'w', buffering=buffer_size)
+        self.first_line = True
+
+    def write_lines(self, lines: List[str]):
+        if not lines:
+            return
+        if not self.first_line:
+            self.file.write('\n')
+        self.file.write('\n'.join(lines))
+        self.first_line = False
+
+    def write_step(self, step: List[Clause]):
+        clauses = sorted(set(step), key=output_sort_key)
+        self.write_lines([str(len(clauses))] + [str(clause) for clause in clauses])
+
+    def write_verdict(self, entails: bool):
+        self.write_lines(["YES" if entails else "NO"])
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self) -> 'OutputWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
 def parse_input(file_path: str) -> Tuple[Clause, List[Clause]]:
     try:
         with open(file_path, 'r') as file:
@@ -160,19 +311,243 @@ def parse_input(file_path: str) -> Tuple[Clause, List[Clause]]:
         exit(1)
 
 
+def load_input(file_path: str) -> Tuple[Clause, List[Clause]]:
+    '''Read a PS4 text, DIMACS CNF or binary clause file.'''
+    if clause_formats.is_binary(file_path):
+        alpha, kb = clause_formats.read_binary(file_path)
+    elif clause_formats.is_dimacs(file_path):
+        alpha, kb = clause_formats.read_dimacs(file_path)
+    else:
+        return parse_input(file_path)
+    return Clause(set(alpha)), [Clause(set(clause)) for clause in kb]
+
+
+def convert(input_file: str, output_file: str):
+    '''Convert the input file to DIMACS (.cnf, .dimacs) or to the binary format.'''
+    alpha, clauses = load_input(input_file)
+    # Same literal order as in the output file
+    alpha_literals = sorted(alpha.literals, key=lambda lit: lit.lstrip('-'))
+    kb = [sorted(clause.literals, key=lambda lit: lit.lstrip('-')) for clause in clauses]
+    if output_file.endswith(('.cnf', '.dimacs')):
+        clause_formats.write_dimacs(output_file, alpha_literals, kb)
+    else:
+        clause_formats.write_binary(output_file, alpha_literals, kb)
+
+
+def solve(input_file: str, output_file: str, preprocess: bool = False,
+          decompose: bool = False, proof_file: str = None, proof_format: str = 'tstp',
+          compress: bool = False, loop_trace: bool = False):
+    with STATS.timer('parse_input'):
+        alpha, clauses = load_input(input_file)
+
+    kb = KnowledgeBase(loop_trace)
+    for clause in clauses:
+        kb.add_clause(clause)
+
+    # Each loop is written as soon as it finishes
+    with OutputWriter(output_file, compress) as writer:
+        with STATS.timer('pl_resolution'):
+            _, entails, _, _ = kb.pl_resolution(
+                alpha, preprocess, decompose, on_step=writer.write_step)
+        writer.write_verdict(entails)
+
+    if proof_file:
+        if kb.write_proof(proof_file, proof_format):
+            print(f"Proof ({len(kb.proof.minimal_proof())}/{len(kb.proof)} clauses) written to {proof_file}")
+        else:
+            print("KB does not entail alpha, no proof written.")
+
+
+def parse_queries(file_path: str) -> List[Clause]:
+    '''One alpha per line, blank lines are skipped.'''
+    with open(file_path, 'r') as file:
+        return [Clause.parse(line) for line in file if line.strip()]
+
+
+def solve_batch(input_file: str, queries_file: str, output_file: str):
+    # The alpha of the input file is ignored, like with --serve
+    _, clauses = load_input(input_file)
+    alphas = parse_queries(queries_file)
+
+    kb = KnowledgeBase()
+    for clause in clauses:
+        kb.add_clause(clause)
+    verdicts = kb.ask_batch(alphas)
+
+    with open(output_file, 'w') as file:
+        file.write('\n'.join("YES" if entails else "NO" for entails in verdicts))
+
+
+def entails_by_resolution(alpha: List[str], clauses: List[List[str]]) -> bool:
+    # Nobody reads the trace of a portfolio engine
+    kb = KnowledgeBase(loop_trace=True)
+    for clause in clauses:
+        kb.add_clause(Clause(set(clause)))
+    _, entails, _, _ = kb.pl_resolution(Clause(set(alpha)))
+    return entails
+
+
+def entails_by_saturation(alpha: List[str], clauses: List[List[str]]) -> bool:
+    from batch import batch_entails
+    return batch_entails(clauses, [alpha])[0]
+
+
+def entails_by_model_search(alpha: List[str], clauses: List[List[str]]) -> bool:
+    '''KB entails alpha iff KB AND NOT alpha has no model, searched with the
+    backtracking model checker of logic.py.'''
+    import logic
+
+    if any(not clause for clause in clauses):
+        return True
+
+    def literal_form(literal: str) -> logic.Formula:
+        atom = logic.Atom(literal.lstrip('-'))
+        return logic.Not(atom) if literal.startswith('-') else atom
+
+    forms = [logic.OrList([literal_form(lit) for lit in sorted(clause)]) for clause in clauses]
+    forms += [literal_form(Clause.negate_literal(lit)) for lit in sorted(alpha)]
+    return not logic.performModelChecking(forms, findAll=False)
+
+
+def portfolio_engines() -> Dict[str, Callable[[List[str], List[List[str]]], bool]]:
+    '''The engines of --portfolio; model search needs logic.py next to PS4.'''
+    from importlib.util import find_spec
+    engines = {'resolution': entails_by_resolution, 'saturation': entails_by_saturation}
+    if find_spec('logic') is not None:
+        engines['model-search'] = entails_by_model_search
+    return engines
+
+
+def solve_portfolio(input_file: str, output_file: str, record_file: str = None,
+                    timeout: float = None):
+    from functools import partial
+    from portfolio import race, record
+
+    alpha, clauses = load_input(input_file)
+    alpha_literals = sorted(alpha.literals)
+    kb = [sorted(clause.literals) for clause in clauses]
+    engines = {name: partial(engine, alpha_literals, kb)
+               for name, engine in portfolio_engines().items()}
+    result = race(engines, timeout)
+    print(result)
+    if record_file:
+        record(result, record_file, input_file)
+
+    with open(output_file, 'w') as file:
+        if result.verdict is not None:
+            file.write("YES" if result.verdict else "NO")
+
+
+def serve(input_file: str, host: str = None, port: int = None, snapshot_file: str = None):
+    '''With |snapshot_file|, the saturated KB is loaded from it if it was saved
+    from the same input clauses, or saturated again and saved to it otherwise;
+    the lemmas learned while serving are appended to it when the server stops.'''
+    import asyncio
+    from server import WarmKnowledgeBase, serve_socket, serve_stdin
+    from snapshot import KBSnapshot, StaleSnapshotError, clause_digest
+
+    # The alpha line of the input file is ignored, queries come from the client
+    _, clauses = load_input(input_file)
+    kb, snapshot = None, None
+    if snapshot_file:
+        digest = clause_digest(clause.literals for clause in clauses)
+        if os.path.exists(snapshot_file):
+            try:
+                snapshot, kb = KBSnapshot.load(snapshot_file, digest)
+            except StaleSnapshotError as e:
+                # stdout is the query protocol
+                print(f"{e}, saturating {input_file} again", file=sys.stderr, flush=True)
+    if kb is None:
+        kb = WarmKnowledgeBase(clause.literals for clause in clauses)
+        snapshot = KBSnapshot.create(kb, snapshot_file, digest) if snapshot_file else None
+
+    def parse_query(line: str) -> Set[str]:
+        return Clause.parse(line).literals
+
+    try:
+        if port is None:
+            serve_stdin(kb, parse_query)
+        else:
+            asyncio.run(serve_socket(kb, parse_query, host, port))
+    finally:
+        if snapshot:
+            snapshot.append(kb)
+
+
 def main():
     '''Main function to run the program.
     -----------------------------------
     Run the program in command line with the following options:
-    -i or --input_file: Path to the input file
+    -i or --input_file: Path to the input file (PS4 text, DIMACS CNF or binary clauses)
     -o or --output_file: Path to the output file
     -all: Run all input files in the Input folder
+    --preprocess: Simplify the clauses before resolution
+    --components: Only resolve the clauses connected to the negated alpha
+    --queries: Answer every alpha of a file (one per line) against the KB, one YES/NO per line
+    --portfolio: Race resolution, saturation and model search; the first verdict (YES/NO) is written
+    --portfolio-log: Append the winner of every --portfolio run to this JSON lines file
+    --portfolio-timeout: Stop the --portfolio race after this many seconds (nothing is written)
+    --serve: Load the KB of the input file once and answer one alpha per line
+    --host, --port: Serve the same line protocol over TCP instead of stdin
+    --snapshot: With --serve, load the saturated KB from this file (saved on first use,
+                saved again when the input clauses change)
+    --proof: Write the clauses used to derive {} to a file
+    --proof-format: tstp (default) or lrat (also writes <proof>.cnf)
+    --gzip: Write the output file gzip-compressed
+    --loop-trace: Print only each loop's resolutions, not all of them so far, after every loop
+    --convert: Convert the input file to DIMACS (.cnf) or binary clauses (other extensions)
+    --stats: Write engine counters and timers to a JSON file
+    --profile: Write a cProfile report (readable with pstats) to a file
     -----------------------------------
     Syntax: 
     python source_code.py -i <input_file> -o <output_file>
     or
     python source_code.py -all
+    or
+    python source_code.py -i <input_file> --serve [--port <port>] [--snapshot <kb_file>]
+    or
+    python source_code.py -i <input_file> --queries <queries_file> -o <output_file>
+    or
+    python source_code.py -i <input_file> -o <output_file> --portfolio [--portfolio-log <log_file>]
+                                                          [--portfolio-timeout <seconds>]
+    The folder itself (python PS4 ...) and the single-file build of
+    build_zipapp.py (python resolver.pyz ...) take the same options.
     '''
+    args = parse_args_fast(sys.argv[1:]) or build_parser().parse_args()
+
+    if args.stats:
+        STATS.enable()
+    if args.profile:
+        profiled(args.profile, run, args)
+    else:
+        run(args)
+    if args.stats:
+        STATS.dump_json(args.stats)
+
+
+# Value of every option that is not given
+DEFAULTS = dict(input_file=None, output_file=None, all=False, preprocess=False, components=False,
+                queries=None, portfolio=False, portfolio_log=None, portfolio_timeout=None,
+                serve=False, host='127.0.0.1', port=None, snapshot=None, proof=None,
+                proof_format='tstp', gzip=False, loop_trace=False, convert=None, stats=None, profile=None)
+
+
+def parse_args_fast(argv: List[str]) -> Optional[SimpleNamespace]:
+    '''Parse the plain "-i <input_file> -o <output_file>" call without argparse,
+    which takes longer to import than a small problem takes to solve.
+    Return None for any other command line.'''
+    names = {'-i': 'input_file', '--input_file': 'input_file',
+             '-o': 'output_file', '--output_file': 'output_file'}
+    if len(argv) != 4 or any(value.startswith('-') for value in argv[1::2]):
+        return None
+    options = {names.get(option): value for option, value in zip(argv[0::2], argv[1::2])}
+    if set(options) != {'input_file', 'output_file'}:
+        return None
+    return SimpleNamespace(**dict(DEFAULTS, **options))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    import argparse
     parser = argparse.ArgumentParser(
         description='PL Resolution to check if KB entails alpha.')
     parser.add_argument('-i', '--input_file', type=str,
@@ -181,10 +556,69 @@ def main():
                         help='Path to the output file')
     parser.add_argument('-all', action='store_true',
                         help='Run all input files in the Input folder')
+    parser.add_argument('--preprocess', action='store_true',
+                        help='Simplify the clauses before resolution (same verdict, fewer loops)')
+    parser.add_argument('--components', action='store_true',
+                        help='Only resolve the clauses connected to the negated alpha')
+    parser.add_argument('--queries', type=str,
+                        help='Answer every alpha of this file (one per line) against the KB')
+    parser.add_argument('--portfolio', action='store_true',
+                        help='Race the engines in parallel processes, keep the first verdict')
+    parser.add_argument('--portfolio-log', type=str,
+                        help='Append the winning engine of --portfolio to this JSON lines file')
+    parser.add_argument('--portfolio-timeout', type=float,
+                        help='Give up the --portfolio race after this many seconds')
+    parser.add_argument('--serve', action='store_true',
+                        help='Answer alpha queries (one per line) against the KB of the input file')
+    parser.add_argument('--host', type=str,
+                        help='Host to listen on with --serve --port')
+    parser.add_argument('--port', type=int,
+                        help='Serve over TCP on this port instead of stdin')
+    parser.add_argument('--snapshot', type=str,
+                        help='With --serve, load the saturated KB from this file '
+                             '(saved on first use and whenever the input clauses change)')
+    parser.add_argument('--proof', type=str,
+                        help='Write the minimal refutation to this file')
+    parser.add_argument('--proof-format', choices=['tstp', 'lrat'],
+                        help='Format of the --proof file')
+    parser.add_argument('--gzip', action='store_true',
+                        help='Write the output file gzip-compressed')
+    parser.add_argument('--loop-trace', action='store_true',
+                        help="Print only each loop's resolutions after every loop")
+    parser.add_argument('--convert', type=str,
+                        help='Convert the input file to this file (.cnf: DIMACS, else binary)')
+    parser.add_argument('--stats', type=str,
+                        help='Write engine counters and timers to this JSON file')
+    parser.add_argument('--profile', type=str,
+                        help='Write a cProfile report to this file')
+    parser.set_defaults(**DEFAULTS)
+    return parser
+
+
+def run(args: argparse.Namespace):
+    try:
+        dispatch(args)
+    except clause_formats.FormatError as e:
+        # Same report as parse_input for a malformed PS4 text file
+        print(f"Error reading file: {e}")
+        exit(1)
 
-    args = parser.parse_args()
 
-    if args.all:
+def dispatch(args: argparse.Namespace):
+    if args.convert and args.input_file:
+        convert(args.input_file, args.convert)
+
+    elif args.queries and args.input_file and args.output_file:
+        solve_batch(args.input_file, args.queries, args.output_file)
+
+    elif args.portfolio and args.input_file and args.output_file:
+        solve_portfolio(args.input_file, args.output_file, args.portfolio_log,
+                        args.portfolio_timeout)
+
+    elif args.serve and args.input_file:
+        serve(args.input_file, args.host, args.port, args.snapshot)
+
+    elif args.all:
         input_folder = 'Input'
         output_folder = 'Output'
 
@@ -195,37 +629,15 @@ def main():
             output_file = os.path.join(output_folder, f'output0{i}.txt')
 
             if os.path.exists(input_file):
-                alpha, clauses = parse_input(input_file)
-
-                kb = KnowledgeBase()
-                for clause in clauses:
-                    kb.add_clause(clause)
-
-                all_steps, entails, conflict_clause1, conflict_clause2 = kb.pl_resolution(
-                    alpha)
-                output = format_output(
-                    all_steps, entails, (conflict_clause1, conflict_clause2))
-
-                with open(output_file, 'w') as file:
-                    file.write(output)
-
+                proof_file = os.path.join(output_folder, f'proof0{i}.txt') if args.proof else None
+                solve(input_file, output_file, args.preprocess, args.components,
+                      proof_file, args.proof_format, args.gzip, args.loop_trace)
             else:
                 print(f"Input file {input_file} does not exist.")
 
     elif args.input_file and args.output_file:
-        alpha, clauses = parse_input(args.input_file)
-
-        kb = KnowledgeBase()
-        for clause in clauses:
-            kb.add_clause(clause)
-
-        all_steps, entails, conflict_clause1, conflict_clause2 = kb.pl_resolution(
-            alpha)
-        output = format_output(
-            all_steps, entails, (conflict_clause1, conflict_clause2))
-
-        with open(args.output_file, 'w') as file:
-            file.write(output)
+        solve(args.input_file, args.output_file, args.preprocess, args.components,
+              args.proof, args.proof_format, args.gzip, args.loop_trace)
 
     else:
         print("Please provide either -all flag or both -i and -o flags.")
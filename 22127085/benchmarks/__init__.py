@@ -0,0 +1,18 @@
+'''Reproducible benchmarks for the PS4 resolver and logic.py.
+
+Run from the 22127085 folder:
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+    python -m benchmarks.startup
+    python -m benchmarks.models
+'''
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# logic.py lives in the project folder and the PS4 modules import each other
+# as top-level modules, so both folders must be importable.
+for path in (ROOT, os.path.join(ROOT, 'PS4')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
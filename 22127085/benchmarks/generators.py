@@ -0,0 +1,186 @@
+import random
+from typing import List, Optional
+
+# A propositional literal is a string in the PS4 input format: 'A' or '-A'
+Literals = List[str]
+
+# Clauses per variable at the 3-SAT satisfiability phase transition
+PHASE_TRANSITION_RATIO = {2: 1.0, 3: 4.26, 4: 9.93, 5: 21.11}
+
+
+class Problem:
+    def __init__(self, family: str, size: int, kb: Optional[List[Literals]] = None,
+                 alpha: Optional[Literals] = None, forms=None, query=None, objects=None,
+                 expected: Optional[str] = None):
+        self.family = family
+        self.size = size
+        # Propositional problems: CNF clauses and the alpha clause (PS4 format)
+        self.kb = kb
+        self.alpha = alpha
+        # First-order problems: logic.py formulas, the query and the objects
+        self.forms = forms
+        self.query = query
+        self.objects = objects
+        # Known verdict ('YES' or 'NO'), checked by the runner when set
+        self.expected = expected
+
+    @property
+    def name(self) -> str:
+        return f"{self.family}-{self.size}"
+
+    @property
+    def propositional(self) -> bool:
+        return self.kb is not None
+
+    def to_input(self) -> str:
+        '''Render the problem as a PS4 input file.'''
+        lines = [' OR '.join(self.alpha), str(len(self.kb))]
+        lines.extend(' OR '.join(clause) for clause in self.kb)
+        return '\n'.join(lines) + '\n'
+
+
+def variable_names(n: int) -> List[str]:
+    return [f"X{i}" for i in range(1, n + 1)]
+
+
+def random_kcnf(n: int, k: int = 3, ratio: Optional[float] = None, seed: int = 0) -> Problem:
+    '''Random k-CNF over n variables, with ratio * n clauses (phase transition by default).'''
+    rng = random.Random(seed * 1000003 + n)
+    ratio = PHASE_TRANSITION_RATIO.get(k, 4.26) if ratio is None else ratio
+    names = variable_names(n)
+    kb = []
+    for _ in range(max(1, round(ratio * n))):
+        kb.append([rng.choice(['', '-']) + var for var in rng.sample(names, min(k, n))])
+    alpha = [rng.choice(['', '-']) + rng.choice(names)]
+    return Problem(f"random{k}cnf", n, kb=kb, alpha=alpha)
+
+
+def pigeonhole(holes: int) -> Problem:
+    '''holes + 1 pigeons in |holes| holes: unsatisfiable, so every alpha is entailed.'''
+    pigeons = holes + 1
+
+    def var(p: int, h: int) -> str:
+        return f"P{p}H{h}"
+
+    kb = [[var(p, h) for h in range(holes)] for p in range(pigeons)]
+    for h in range(holes):
+        for p in range(pigeons):
+            for q in range(p + 1, pigeons):
+                kb.append(['-' + var(p, h), '-' + var(q, h)])
+    return Problem("pigeonhole", holes, kb=kb, alpha=[var(0, 0)])
+
+
+def horn_chain(n: int) -> Problem:
+    '''X1, X1 => X2, ..., X(n-1) => Xn; alpha = Xn (entailed after n-1 steps).'''
+    names = variable_names(n)
+    kb = [[names[0]]]
+    kb.extend(['-' + names[i], names[i + 1]] for i in range(n - 1))
+    return Problem("horn", n, kb=kb, alpha=[names[-1]])
+
+
+def horn_random(n: int, seed: int = 0) -> Problem:
+    '''Random definite Horn KB: rules with 1-2 premises over earlier variables.'''
+    rng = random.Random(seed * 1000003 + n)
+    names = variable_names(n)
+    kb = [[names[0]], [names[1]]]
+    for i in range(2, n):
+        premises = rng.sample(names[:i], rng.randint(1, min(2, i)))
+        kb.append(['-' + p for p in premises] + [names[i]])
+    return Problem("hornrandom", n, kb=kb, alpha=[names[-1]])
+
+
+def family(n: int, relation: str = '2d', seed: int = 0) -> Problem:
+    '''Family relation KB mirroring formula2a-formula2d of the notebook over n >= 3 people.'''
+    # Imported here so that the propositional generators don't need logic.py
+    from logic import And, Atom, Equiv, Exists, Forall, Implies, Not
+
+    rng = random.Random(seed * 1000003 + n)
+    people = [f"p{i}" for i in range(n)]
+
+    def Person(x): return Atom('Person', x)
+    def Female(x): return Atom('Female', x)
+    def Mother(x, y): return Atom('Mother', x, y)
+    def Child(x, y): return Atom('Child', x, y)
+    def Daughter(x, y): return Atom('Daughter', x, y)
+    def Parent(x, y): return Atom('Parent', x, y)
+    def Grandmother(x, y): return Atom('Grandmother', x, y)
+
+    forms = []
+    if relation == '2a':
+        forms.append(Forall('$x', Implies(Person('$x'), Exists('$y', Mother('$x', '$y')))))
+        forms.extend(Person(p) for p in people)
+        forms.append(Mother(people[0], people[-1]))
+        query = Exists('$y', Mother(people[-1], '$y'))
+    elif relation == '2b':
+        forms.append(Exists('$x', And(Person('$x'), Forall('$y', Not(Child('$x', '$y'))))))
+        forms.extend(Person(p) for p in people)
+        forms.extend(Child(people[i], people[i + 1]) for i in range(n - 1))
+        query = Child(people[-1], people[0])
+    elif relation == '2c':
+        forms.append(Forall('$x', Forall('$y', Equiv(Daughter('$x', '$y'),
+                                                     And(Female('$y'), Child('$x', '$y'))))))
+        forms.extend(Female(p) for p in people if rng.random() < 0.5)
+        forms.extend(Child(people[i], people[i + 1]) for i in range(n - 1))
+        forms.append(Female(people[-1]))
+        query = Daughter(people[-2], people[-1])
+    elif relation == '2d':
+        forms.append(Forall('$x', Forall('$y', Equiv(
+            Grandmother('$x', '$y'),
+            And(Female('$y'), Exists('$z', And(Parent('$x', '$z'), Parent('$z', '$y'))))))))
+        forms.extend(Parent(people[i], people[i + 1]) for i in range(n - 1))
+        forms.extend(Female(p) for p in people)
+        query = Grandmother(people[0], people[2])
+    else:
+        raise ValueError(f"Unknown family relation: {relation}")
+    return Problem(f"family{relation}", n, forms=forms, query=query, objects=people)
+
+
+def factoring(n: int) -> Problem:
+    '''First-order KB whose refutation needs a resolvent that only a factor
+    would subsume: R(x,x) | R(p0,x) must not discard -P(p0) | R(p0,p0).'''
+    from logic import Atom, Forall, Implies, Not, Or
+
+    people = [f"p{i}" for i in range(n)]
+    forms = [Forall('$x', Or(Atom('R', '$x', '$x'), Atom('R', people[0], '$x'))),
+             Implies(Atom('P', people[0]), Not(Atom('R', people[0], people[0])))]
+    forms.extend(Implies(Atom('P', people[i + 1]), Atom('P', people[i])) for i in range(n - 1))
+    return Problem("factoring", n, forms=forms, query=Not(Atom('P', people[-1])),
+                   objects=people, expected="YES")
+
+
+def to_logic(problem: Problem):
+    '''Translate a propositional problem into logic.py formulas (forms, query).'''
+    from logic import Atom, Not, OrList
+
+    def literal(lit: str):
+        return Not(Atom(lit[1:])) if lit.startswith('-') else Atom(lit)
+
+    forms = [OrList([literal(lit) for lit in clause]) for clause in problem.kb]
+    query = OrList([literal(lit) for lit in problem.alpha])
+    return forms, query
+
+
+GENERATORS = {
+    'random3cnf': lambda size, seed: random_kcnf(size, 3, seed=seed),
+    'pigeonhole': lambda size, seed: pigeonhole(size),
+    'horn': lambda size, seed: horn_chain(size),
+    'hornrandom': lambda size, seed: horn_random(size, seed=seed),
+    'family2a': lambda size, seed: family(size, '2a', seed=seed),
+    'family2b': lambda size, seed: family(size, '2b', seed=seed),
+    'family2c': lambda size, seed: family(size, '2c', seed=seed),
+    'family2d': lambda size, seed: family(size, '2d', seed=seed),
+    'factoring': lambda size, seed: factoring(size),
+}
+
+# Default sizes: small enough for the quadratic resolution loop
+DEFAULT_SIZES = {
+    'random3cnf': [4, 5],
+    'pigeonhole': [1, 2],
+    'horn': [4, 8, 12],
+    'hornrandom': [6, 10],
+    'family2a': [3, 4],
+    'family2b': [3, 4],
+    'family2c': [3, 4],
+    'family2d': [3, 4],
+    'factoring': [1, 3],
+}
@@ -0,0 +1,71 @@
+import argparse
+import random
+import sys
+from typing import List
+
+
+def random_case(rng: random.Random):
+    '''Random ground and quantified rules over two objects, and random facts.'''
+    from logic import And, Atom, Forall, Implies, Not, Or
+
+    atoms = [Atom('P', 'a'), Atom('P', 'b'), Atom('Q', 'a'), Atom('Q', 'b'), Atom('R', 'a', 'b')]
+
+    def formula(depth: int):
+        if depth == 0 or rng.random() < 0.3:
+            atom = rng.choice(atoms)
+            return Not(atom) if rng.random() < 0.3 else atom
+        if rng.random() < 0.2:
+            return Not(formula(depth - 1))
+        return rng.choice([And, Or, Implies])(formula(depth - 1), formula(depth - 1))
+
+    forms = [formula(3) for _ in range(rng.randint(1, 3))]
+    if rng.random() < 0.3:
+        forms.append(Forall('$x', Implies(Atom('P', '$x'), Atom('Q', '$x'))))
+    facts = {atom: rng.random() < 0.5 for atom in rng.sample(atoms, rng.randint(1, 3))}
+    return forms, facts
+
+
+def check_facts(cases: int, seed: int) -> List[str]:
+    '''Return the cases where performModelChecking with a fact table finds other
+    models than with the facts conjoined as formulas.'''
+    from logic import Not, performModelChecking, rstr
+
+    def key(models):
+        return sorted(sorted(map(str, model)) for model in models)
+
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(cases):
+        forms, facts = random_case(rng)
+        fact_forms = [atom if value else Not(atom) for atom, value in facts.items()]
+        for symmetry in (False, True):
+            models = performModelChecking(forms, findAll=True, symmetry=symmetry, facts=facts)
+            expected = performModelChecking(forms + fact_forms, findAll=True, symmetry=symmetry)
+            if key(models) != key(expected):
+                mismatches.append(f"{rstr(forms)} facts={rstr(fact_forms)} symmetry={symmetry}: "
+                                  f"{key(models)} != {key(expected)}")
+    return mismatches
+
+
+def main():
+    '''Model set checks.
+    -----------------------------------
+    Syntax:
+    python -m benchmarks.models [--cases 300] [--seed 0]
+    The exit status is 1 if the model sets differ on some case.
+    '''
+    parser = argparse.ArgumentParser(description='Compare the model sets of the model checking shortcuts.')
+    parser.add_argument('--cases', type=int, default=300, help='Random cases to check')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random cases')
+    args = parser.parse_args()
+
+    mismatches = check_facts(args.cases, args.seed)
+    for mismatch in mismatches:
+        print(f"MISMATCH {mismatch}")
+    if mismatches:
+        sys.exit(1)
+    print(f"Same models on {args.cases} cases.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import signal
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.generators import DEFAULT_SIZES, GENERATORS, Problem, to_logic
+from instrument import STATS
+
+
+class BenchmarkTimeout(Exception):
+    pass
+
+
+def run_ps4(problem: Problem) -> str:
+    from source_code import Clause, KnowledgeBase
+
+    kb = KnowledgeBase(loop_trace=True)
+    for clause in problem.kb:
+        kb.add_clause(Clause(set(clause)))
+    _, entails, _, _ = kb.pl_resolution(Clause(set(problem.alpha)))
+    return "YES" if entails else "NO"
+
+
+def run_logic(problem: Problem, create_kb) -> str:
+    import logic
+
+    if problem.propositional:
+        forms, query = to_logic(problem)
+    else:
+        forms, query = problem.forms, problem.query
+    kb = create_kb()
+    # Like the notebook: declare the objects first, so that quantifiers in the
+    # first rules already range over the whole domain
+    for obj in problem.objects or []:
+        kb.tell(logic.Atom('Object', obj))
+    for form in forms:
+        kb.tell(form)
+    response = kb.ask(query)
+    return "YES" if response.status == logic.ENTAILMENT else "NO"
+
+
+def run_resolution(problem: Problem, strategy: str = 'unrestricted') -> str:
+    import logic
+    return run_logic(problem, lambda: logic.createResolutionKB(strategy, subsumption=True))
+
+
+def run_model_checking(problem: Problem) -> str:
+    import logic
+    return run_logic(problem, logic.createModelCheckingKB)
+
+
+ENGINES = {
+    'ps4': run_ps4,
+    'resolution': run_resolution,
+    'resolution-ordered': lambda problem: run_resolution(problem, 'ordered'),
+    'resolution-selection': lambda problem: run_resolution(problem, 'selection'),
+    'resolution-sos': lambda problem: run_resolution(problem, 'sos'),
+    'modelchecking': run_model_checking,
+}
+
+
+def time_case(engine: str, problem: Problem, repeat: int, timeout: float) -> Dict:
+    result = {'problem': problem.name, 'family': problem.family, 'size': problem.size,
+              'engine': engine}
+
+    def on_timeout(signum, frame):
+        raise BenchmarkTimeout()
+
+    times = []
+    verdict = None
+    handler = signal.signal(signal.SIGALRM, on_timeout)
+    try:
+        for _ in range(repeat):
+            # Counters of the last run are kept
+            STATS.reset()
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+            start = time.perf_counter()
+            # The engines print their traces, which is not what we time
+            with contextlib.redirect_stdout(io.StringIO()):
+                verdict = ENGINES[engine](problem)
+            times.append(time.perf_counter() - start)
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        result.update(status='ok', verdict=verdict,
+                      min=min(times), median=statistics.median(times), runs=len(times))
+    except BenchmarkTimeout:
+        result.update(status='timeout', verdict=None, min=None, median=None, runs=len(times))
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, handler)
+    if problem.expected is not None:
+        result['expected'] = problem.expected
+    if STATS.enabled:
+        result['stats'] = STATS.to_dict()
+    return result
+
+
+def run_suite(families: List[str], engines: List[str], sizes: Optional[List[int]],
+              seed: int, repeat: int, timeout: float) -> Dict:
+    results = []
+    for family in families:
+        for size in sizes or DEFAULT_SIZES[family]:
+            problem = GENERATORS[family](size, seed)
+            for engine in engines:
+                if engine == 'ps4' and not problem.propositional:
+                    continue
+                result = time_case(engine, problem, repeat, timeout)
+                print_result(result)
+                results.append(result)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'repeat': repeat,
+            'timeout': timeout,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def print_result(result: Dict):
+    seconds = f"{result['min'] * 1000:10.2f} ms" if result['status'] == 'ok' else '   timeout'
+    kept = result.get('stats', {}).get('counters', {}).get('resolvents_kept')
+    derivations = f"  {kept} kept" if kept is not None else ''
+    print(f"{result['problem']:<16} {result['engine']:<22} {seconds}  {result['verdict'] or ''}"
+          f"{derivations}", flush=True)
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float, noise: float) -> List[str]:
+    '''Return the regressions of |current| against |baseline|.
+    -----------------------------------
+    A case regresses if its verdict changed, if it now times out, or if its
+    best time grew by more than |tolerance| (relative) and |noise| seconds.
+    '''
+    def key(result: Dict) -> str:
+        return f"{result['problem']}/{result['engine']}"
+
+    old = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = old.get(key(result))
+        if before is None or before['status'] != 'ok':
+            continue
+        if result['status'] != 'ok':
+            regressions.append(f"{key(result)}: timeout (was {before['min']:.4f}s)")
+        elif result['verdict'] != before['verdict']:
+            regressions.append(f"{key(result)}: verdict {before['verdict']} -> {result['verdict']}")
+        elif (result['min'] > before['min'] * (1 + tolerance)
+              and result['min'] - before['min'] > noise):
+            regressions.append(f"{key(result)}: {before['min']:.4f}s -> {result['min']:.4f}s")
+    return regressions
+
+
+def main():
+    '''Benchmark runner.
+    -----------------------------------
+    Syntax:
+    python -m benchmarks.run [--families random3cnf horn ...] [--engines ps4 ...]
+                             [--sizes 4 5 6] [--save results.json]
+                             [--baseline baseline.json]
+    The exit status is 1 if a regression against the baseline is found, or if
+    an engine gives a wrong verdict on a problem whose verdict is known.
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark the inference engines.')
+    parser.add_argument('--families', nargs='+', choices=sorted(GENERATORS),
+                        default=sorted(GENERATORS), help='Problem families to run')
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES),
+                        default=sorted(ENGINES), help='Engines to time')
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        help='Problem sizes (default: per family)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random generators')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case (best time is kept)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Seconds per run')
+    parser.add_argument('--stats', action='store_true',
+                        help='Record the engine counters of every case (adds overhead)')
+    parser.add_argument('--save', type=str, help='Write the results to this JSON file')
+    parser.add_argument('--baseline', type=str, help='Compare with this JSON results file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Relative slowdown allowed against the baseline')
+    parser.add_argument('--noise', type=float, default=0.002,
+                        help='Absolute slowdown (seconds) ignored against the baseline')
+    args = parser.parse_args()
+
+    if args.stats:
+        STATS.enable()
+    results = run_suite(args.families, args.engines, args.sizes,
+                        args.seed, args.repeat, args.timeout)
+
+    # Problems with a known verdict catch wrong answers even without a baseline
+    wrong = [result for result in results['results'] if result['status'] == 'ok'
+             and result.get('expected', result['verdict']) != result['verdict']]
+    for result in wrong:
+        print(f"WRONG {result['problem']}/{result['engine']}: {result['verdict']}"
+              f" (expected {result['expected']})")
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance, args.noise)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+    if wrong:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import compileall
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks import ROOT
+from benchmarks.generators import horn_chain
+from build_zipapp import build_zipapp
+
+PS4 = os.path.join(ROOT, 'PS4')
+
+
+def wall_time(command: List[str], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def import_times(command: List[str]) -> List[Tuple[int, str]]:
+    '''Cumulative microseconds of every top-level import, slowest first (python -X importtime).'''
+    stderr = subprocess.run([command[0], '-X', 'importtime'] + command[1:], stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| (\S+)$', line)
+        if match:
+            rows.append((int(match.group(1)), match.group(2)))
+    return sorted(rows, reverse=True)
+
+
+def run_startup(repeat: int, top: int) -> Dict[str, float]:
+    '''Time a trivial query with each entry point against a bare interpreter.'''
+    with tempfile.TemporaryDirectory() as folder:
+        input_file = os.path.join(folder, 'input.txt')
+        output_file = os.path.join(folder, 'output.txt')
+        with open(input_file, 'w') as file:
+            file.write(horn_chain(2).to_input())
+        query = ['-i', input_file, '-o', output_file]
+        zipapp_file = build_zipapp(os.path.join(folder, 'resolver.pyz'))
+        commands = {
+            'bare interpreter': [sys.executable, '-c', 'pass'],
+            'source_code.py': [sys.executable, os.path.join(PS4, 'source_code.py')] + query,
+            'python PS4': [sys.executable, PS4] + query,
+            'zipapp': [sys.executable, zipapp_file] + query,
+        }
+        # Write the bytecode caches first (also under PYTHONDONTWRITEBYTECODE)
+        compileall.compile_dir(PS4, maxlevels=0, quiet=1)
+        compileall.compile_file(os.path.join(ROOT, 'instrument.py'), quiet=1)
+        for command in commands.values():
+            wall_time(command, 1)
+        results = {name: wall_time(command, repeat) for name, command in commands.items()}
+        imports = import_times(commands['source_code.py'])
+
+    for name, seconds in results.items():
+        print(f"{name:<20} {seconds * 1000:8.2f} ms")
+    print("Slowest imports of source_code.py (cumulative):")
+    for microseconds, module in imports[:top]:
+        print(f"  {module:<30} {microseconds / 1000:8.2f} ms")
+    return results
+
+
+def main():
+    '''Startup benchmark of the resolver.
+    -----------------------------------
+    Syntax:
+    python -m benchmarks.startup [--repeat 20] [--top 10]
+    '''
+    parser = argparse.ArgumentParser(description='Time the startup of the resolver.')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per entry point (median is kept)')
+    parser.add_argument('--top', type=int, default=10, help='Imports to list')
+    args = parser.parse_args()
+    run_startup(args.repeat, args.top)
+
+
+if __name__ == '__main__':
+    main()
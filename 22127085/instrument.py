@@ -0,0 +1,99 @@
+'''Counters and timers for the inference engines (PS4/source_code.py and logic.py).
+
+Instrumentation is off by default. The engines guard their hot paths with
+`if STATS.enabled:`, so a disabled run only pays for that attribute check.
+
+    from instrument import STATS
+    STATS.enable()
+    ...  # run an engine
+    STATS.dump_json('stats.json')
+
+For a function-level report, run the engine under cProfile with profiled():
+the resulting file can be read with pstats or any cProfile viewer.
+'''
+import collections
+import time
+
+
+class NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+class Timer:
+    def __init__(self, stats: 'Stats', name: str):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.timers[self.name] += time.perf_counter() - self.start
+        self.stats.timer_calls[self.name] += 1
+        return False
+
+
+class Stats:
+    def __init__(self):
+        self.enabled = False
+        self.counters = collections.Counter()
+        self.timers = collections.Counter()
+        self.timer_calls = collections.Counter()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.counters.clear()
+        self.timers.clear()
+        self.timer_calls.clear()
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            self.counters[name] += n
+
+    def timer(self, name: str):
+        return Timer(self, name) if self.enabled else NULL_TIMER
+
+    def to_dict(self) -> dict:
+        return {
+            'counters': dict(sorted(self.counters.items())),
+            'timers': {name: {'seconds': self.timers[name], 'calls': self.timer_calls[name]}
+                       for name in sorted(self.timers)},
+        }
+
+    def dump_json(self, path: str):
+        import json
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def report(self) -> str:
+        lines = [f"{name:<28} {value:>12}" for name, value in sorted(self.counters.items())]
+        lines.extend(f"{name:<28} {self.timers[name]:>11.4f}s ({self.timer_calls[name]} calls)"
+                     for name in sorted(self.timers))
+        return '\n'.join(lines)
+
+
+STATS = Stats()
+
+
+def profiled(path: str, function, *args, **kwargs):
+    '''Run function(*args, **kwargs) under cProfile and write the stats to |path|.'''
+    # Imported here: the engines import this module on every start
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
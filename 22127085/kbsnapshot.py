@@ -0,0 +1,191 @@
+# Snapshots of the permanent derivations of a resolution KnowledgeBase (see
+# logic.py), so that a restart doesn't have to replay every tell().
+#
+# Only clause KBs (createResolutionKB) are supported: every derivation is a
+# literal or a Clause, whose predicates, functions, constants and variables are
+# interned in a symbol table.  Derivations are stored without their children
+# (the cost and whether they were derived are kept).
+#
+# File layout (little-endian):
+# - magic 'LKBS', version (uint32)
+# - one or more segments, the first written by Snapshot.create, the next ones
+#   appended by Snapshot.append:
+#   - magic 'SEGM', number of new symbols, length of their names (uint32 each),
+#     number of ints (uint64)
+#   - newline separated utf-8 names of the new symbols, zero padding up to a
+#     multiple of 4 bytes
+#   - int32 stream:
+#     numCounts, (variable symbol, count) * numCounts  (state of ToCNFRule)
+#     numRemoved, index * numRemoved  (derivations of earlier segments that are gone)
+#     numDerivations, derivation * numDerivations
+#   A derivation is: derived (0/1), cost, numLiterals, literal * numLiterals;
+#   a literal is: predicate symbol + 1 (negated if Not), arity, term * arity;
+#   a term is: the symbol of a constant or variable, or
+#   -(function symbol + 1), arity, term * arity for a Function (Skolem terms).
+# Segments are read straight from a memory map.
+
+import mmap, struct, sys
+from array import array
+from logic import *
+
+MAGIC = b'LKBS'
+VERSION = 1
+HEADER = struct.Struct('<4sI')
+SEGMENT_MAGIC = b'SEGM'
+SEGMENT = struct.Struct('<4sIIQ')
+
+class Snapshot:
+    def __init__(self, path):
+        self.path = path
+        self.symbols = []  # Names of predicates, constants and variables
+        self.symbolIndex = {}  # Map from name to index in |symbols|
+        self.keys = []  # str(form) of every saved derivation, None once removed
+        self.derivations = []  # Derivation of every saved derivation, None once removed
+        self.varCounts = {}  # Last saved ToCNFRule counts
+
+    # Write all the permanent derivations of |kb| to a new file at |path|.
+    @staticmethod
+    def create(kb, path):
+        snapshot = Snapshot(path)
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION))
+        snapshot.append(kb)
+        return snapshot
+
+    # Read the snapshot at |path|; restore() then fills a KB with it.
+    @staticmethod
+    def load(path):
+        snapshot = Snapshot(path)
+        with open(path, 'rb') as f:
+            if f.seek(0, 2) < HEADER.size: raise Exception('Not a KB snapshot: %s' % path)
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC: raise Exception('Not a KB snapshot: %s' % path)
+        if version != VERSION: raise Exception('Unsupported KB snapshot version %d: %s' % (version, path))
+        offset = HEADER.size
+        while offset < len(buffer):
+            if offset + SEGMENT.size > len(buffer): raise Exception('Truncated KB snapshot: %s' % path)
+            magic, numSymbols, namesLength, numInts = SEGMENT.unpack_from(buffer, offset)
+            offset += SEGMENT.size
+            end = offset + namesLength + (-namesLength % 4) + 4 * numInts
+            if magic != SEGMENT_MAGIC or end > len(buffer): raise Exception('Truncated KB snapshot: %s' % path)
+            names = buffer[offset:offset + namesLength].decode('utf-8')
+            for name in (names.split('\n') if numSymbols > 0 else []): snapshot.intern(name)
+            if len(snapshot.symbols) != len(snapshot.symbolIndex): raise Exception('Corrupt symbol table: %s' % path)
+            offset += namesLength + (-namesLength % 4)
+            ints = memoryview(buffer)[offset:end].cast('i')
+            if sys.byteorder != 'little':
+                ints = array('i', ints)
+                ints.byteswap()
+            snapshot.decodeSegment(ints)
+            offset = end
+        return snapshot
+
+    def intern(self, name):
+        if name not in self.symbolIndex:
+            self.symbolIndex[name] = len(self.symbols)
+            self.symbols.append(name)
+        return self.symbolIndex[name]
+
+    def decodeSegment(self, ints):
+        symbols = self.symbols
+        i = 0
+        def read():
+            nonlocal i
+            i += 1
+            return ints[i - 1]
+        def readTerm():
+            symbol = read()
+            if symbol >= 0: return toExpr(symbols[symbol])
+            return Function(*[symbols[-symbol - 1]] + [readTerm() for _ in range(read())])
+        for _ in range(read()):
+            name = symbols[read()]
+            self.varCounts[name] = read()
+        for _ in range(read()):
+            index = read()
+            self.keys[index] = self.derivations[index] = None
+        for _ in range(read()):
+            derived = read() == 1
+            cost = read()
+            literals = []
+            for _ in range(read()):
+                predicate = read()
+                atom = Atom(*[symbols[abs(predicate) - 1]] + [readTerm() for _ in range(read())])
+                literals.append(Not(atom) if predicate < 0 else atom)
+            deriv = Derivation(makeClause(literals), children = [], cost = cost, derived = derived)
+            deriv.permanent = True
+            self.derivations.append(deriv)
+            self.keys.append(str(deriv.form))
+
+    # Add the saved derivations to |kb|, which should be empty and created like
+    # the KB that was saved (same strategy and subsumption).
+    def restore(self, kb):
+        for deriv in self.derivations:
+            if deriv == None: continue
+            kb.derivations[deriv.form] = deriv
+            if kb.subsumption: kb.store.add(deriv.form)
+        if isinstance(kb.standardizationRule, ToCNFRule):
+            kb.standardizationRule.varCounts.update(self.varCounts)
+        kb.version += 1
+        kb.askCache.clear()
+
+    # Append a segment with the changes of |kb| since the last save: its new
+    # permanent derivations, and the saved ones it no longer has.
+    def append(self, kb):
+        if kb.modelChecking: raise Exception('Snapshots need a resolution KB')
+        current = dict((str(key), deriv) for key, deriv in kb.derivations.items() if deriv.permanent)
+        saved = set(key for key in self.keys if key != None)
+        removed = [index for index, key in enumerate(self.keys) if key != None and key not in current]
+        added = [deriv for key, deriv in current.items() if key not in saved]
+        varCounts = {}
+        if isinstance(kb.standardizationRule, ToCNFRule):
+            varCounts = dict((name, count) for name, count in kb.standardizationRule.varCounts.items()
+                             if self.varCounts.get(name) != count)
+
+        numSymbols = len(self.symbols)
+        ints = array('i', [len(varCounts)])
+        for name, count in varCounts.items(): ints.extend([self.intern(name), count])
+        ints.append(len(removed))
+        ints.extend(removed)
+        ints.append(len(added))
+        for deriv in added:
+            literals = flattenOr(deriv.form)
+            ints.extend([1 if deriv.derived else 0, deriv.cost, len(literals)])
+            for item in literals:
+                atom = item.arg if item.isa(Not) else item
+                if not atom.isa(Atom): raise Exception('Not a clause: %s' % deriv.form)
+                predicate = self.intern(atom.name) + 1
+                ints.extend([-predicate if item.isa(Not) else predicate, len(atom.args)])
+                for arg in atom.args: self.encodeTerm(arg, ints)
+        if sys.byteorder != 'little': ints.byteswap()
+
+        names = '\n'.join(self.symbols[numSymbols:]).encode('utf-8')
+        with open(self.path, 'ab') as f:
+            f.write(SEGMENT.pack(SEGMENT_MAGIC, len(self.symbols) - numSymbols, len(names), len(ints)))
+            f.write(names)
+            f.write(b'\0' * (-len(names) % 4))
+            ints.tofile(f)
+
+        for index in removed: self.keys[index] = self.derivations[index] = None
+        for deriv in added:
+            self.keys.append(str(deriv.form))
+            self.derivations.append(deriv)
+        self.varCounts.update(varCounts)
+        return len(added), len(removed)
+
+    def encodeTerm(self, term, ints):
+        if term.isa(Function):
+            ints.extend([-self.intern(term.name) - 1, len(term.args)])
+            for arg in term.args: self.encodeTerm(arg, ints)
+        else:
+            ints.append(self.intern(term.name))
+
+# Save |kb| to a new snapshot at |path|; returns the Snapshot to append to later.
+def saveSnapshot(kb, path):
+    return Snapshot.create(kb, path)
+
+# Restore the snapshot at |path| into the empty |kb|; returns the Snapshot to append to later.
+def loadSnapshot(kb, path):
+    snapshot = Snapshot.load(path)
+    snapshot.restore(kb)
+    return snapshot
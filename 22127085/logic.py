@@ -2,6 +2,8 @@
 # @author Percy Liang
 
 import collections
+import itertools
+from instrument import STATS
 
 # Recursively apply str inside map
 def rstr(x):
@@ -59,6 +61,17 @@ class Constant(Term):
         self.strRepn = None
     def computeStrRepn(self): return self.name
 
+# Function symbol (must be uncapitalized) applied to one or more terms.
+# Example: mother(john)
+class Function(Term):
+    def __init__(self, name, *args):
+        if not name[0].islower(): raise Exception('Functions must start with a lowercase letter, but got %s' % name)
+        self.name = name
+        self.args = [self.ensureType(toExpr(arg), Term) for arg in args]
+        if len(self.args) == 0: raise Exception('Function without arguments (use a Constant): %s' % name)
+        self.strRepn = None
+    def computeStrRepn(self): return self.name + '(' + self.join(self.args) + ')'
+
 # Predicate symbol (must be capitalized) applied to arguments.
 # Example: LivesIn(john, palo_alto)
 class Atom(Formula):
@@ -127,6 +140,22 @@ class Forall(Formula):
         self.strRepn = None
     def computeStrRepn(self): return 'Forall(' + str(self.var) + ',' + str(self.body) + ')'
 
+# A disjunction of two or more literals (Atom or Not(Atom)), as produced by CNF
+# conversion and resolution (see makeClause).  The literals are distinct and
+# sorted by str.  It prints like OrList(literals), so it's interchangeable with
+# that formula as a key.
+# Example: Clause([Not(A), B]) prints as Or(Not(A),B)
+class Clause(Formula):
+    def __init__(self, literals):
+        self.literals = tuple(literals)
+        # Signed predicates, e.g. {'-A', 'B'}
+        self.signature = frozenset(('-' + item.arg.name) if item.isa(Not) else item.name for item in self.literals)
+        self.strRepn = None
+    def computeStrRepn(self):
+        result = str(self.literals[0])
+        for item in self.literals[1:]: result = 'Or(' + result + ',' + str(item) + ')'
+        return result
+
 # Take a list of conjuncts / disjuncts and return a formula
 def AndList(forms):
     result = AtomTrue
@@ -149,6 +178,7 @@ def flattenAnd(form):
 # Example: Or(Or(A, And(B, C)), D) => [A, And(B, C), Not(D)]
 def flattenOr(form):
     if form.isa(Or): return flattenOr(form.arg1) + flattenOr(form.arg2)
+    if form.isa(Clause): return list(form.literals)
     else: return [form]
 
 # Syntactic sugar
@@ -189,10 +219,8 @@ class BinaryRule(Rule):
 # Mutate |subst| with variable => bindings
 # Return whether unification was successful
 # Assume forms are in CNF.
-# Note: we don't do occurs check because we don't have function symbols.
 def unify(form1, form2, subst):
-    if form1.isa(Variable): return unifyTerms(form1, form2, subst)
-    if form1.isa(Constant): return unifyTerms(form1, form2, subst)
+    if form1.isa(Term): return unifyTerms(form1, form2, subst)
     if form1.isa(Atom):
         return form2.isa(Atom) and form1.name == form2.name and len(form1.args) == len(form2.args) and \
             all(unify(form1.args[i], form2.args[i], subst) for i in range(len(form1.args)))
@@ -202,6 +230,9 @@ def unify(form1, form2, subst):
         return form2.isa(And) and unify(form1.arg1, form2.arg1, subst) and unify(form1.arg2, form2.arg2, subst)
     if form1.isa(Or):
         return form2.isa(Or) and unify(form1.arg1, form2.arg1, subst) and unify(form1.arg2, form2.arg2, subst)
+    if form1.isa(Clause):
+        return form2.isa(Clause) and len(form1.literals) == len(form2.literals) and \
+            all(unify(form1.literals[i], form2.literals[i], subst) for i in range(len(form1.literals)))
     raise Exception('Unhandled: %s' % form1)
 
 # Follow multiple links to get to x
@@ -216,23 +247,42 @@ def unifyTerms(a, b, subst):
     a = getSubst(subst, a)
     b = getSubst(subst, b)
     if a == b: return True
-    if a.isa(Variable): subst[a] = b
-    elif b.isa(Variable): subst[b] = a
+    if a.isa(Variable):
+        if occurs(a, b, subst): return False
+        subst[a] = b
+    elif b.isa(Variable):
+        if occurs(b, a, subst): return False
+        subst[b] = a
+    elif a.isa(Function) and b.isa(Function):
+        return a.name == b.name and len(a.args) == len(b.args) and \
+            all(unifyTerms(a.args[i], b.args[i], subst) for i in range(len(a.args)))
     else: return False
     return True
 
+# Occurs check: return whether variable |var| appears in |term| under |subst|,
+# so that binding it would create an infinite term ($x = f($x)).
+def occurs(var, term, subst):
+    term = getSubst(subst, term)
+    if term == var: return True
+    if term.isa(Function): return any(occurs(var, arg, subst) for arg in term.args)
+    return False
+
 # Assume form in CNF.
 def applySubst(form, subst):
     if len(subst) == 0: return form
     if form.isa(Variable):
         #print 'applySubst', rstr(form), rstr(subst), rstr(subst.get(form, form))
         #return subst.get(form, form)
-        return getSubst(subst, form)
+        value = getSubst(subst, form)
+        # Variables inside a bound function term may be bound too
+        return applySubst(value, subst) if value.isa(Function) else value
     if form.isa(Constant): return form
+    if form.isa(Function): return Function(*[form.name] + [applySubst(arg, subst) for arg in form.args])
     if form.isa(Atom): return Atom(*[form.name] + [applySubst(arg, subst) for arg in form.args])
     if form.isa(Not): return Not(applySubst(form.arg, subst))
     if form.isa(And): return And(applySubst(form.arg1, subst), applySubst(form.arg2, subst))
     if form.isa(Or): return Or(applySubst(form.arg1, subst), applySubst(form.arg2, subst))
+    if form.isa(Clause): return OrList([applySubst(item, subst) for item in form.literals])
     raise Exception('Unhandled: %s' % form)
 
 ############################################################
@@ -257,6 +307,29 @@ def reduceFormulas(items, mode):
     items = sorted(set(items), key=str)
     return items
 
+# Return the clause of the literals |items|, like OrList(reduceFormulas(items, Or))
+# but in one pass: AtomTrue if it contains A and Not(A), AtomFalse if it is
+# empty, the literal itself if there is only one, a Clause otherwise.
+def makeClause(items):
+    byStr = {}
+    for item in items: byStr[str(item)] = item
+    for key, item in byStr.items():
+        negated = str(item.arg) if item.isa(Not) else 'Not(' + key + ')'
+        if negated in byStr: return AtomTrue
+    if len(byStr) == 0: return AtomFalse
+    if len(byStr) == 1: return item
+    return Clause([byStr[key] for key in sorted(byStr)])
+
+# Signed predicates of a clause or literal, see Clause.
+def signature(form):
+    if form.isa(Clause): return form.signature
+    return frozenset(('-' + item.arg.name) if item.isa(Not) else item.name for item in flattenOr(form))
+
+# Return whether some literal of a clause with signature |signature1| has the
+# predicate of a literal of opposite sign in a clause with |signature2|.
+def complementary(signature1, signature2):
+    return any((name[1:] if name.startswith('-') else '-' + name) in signature2 for name in signature1)
+
 # Generate a list of all subexpressions of a formula (including terms).
 # Example:
 # - Input: And(Atom('A', Constant('a')), Atom('B'))
@@ -267,11 +340,13 @@ def allSubexpressions(form):
         subforms.append(form)
         if form.isa(Variable): pass
         elif form.isa(Constant): pass
-        elif form.isa(Atom):
+        elif form.isa(Function) or form.isa(Atom):
             for arg in form.args: recurse(arg)
         elif form.isa(Not): recurse(form.arg)
         elif form.isa(And): recurse(form.arg1); recurse(form.arg2)
         elif form.isa(Or): recurse(form.arg1); recurse(form.arg2)
+        elif form.isa(Clause):
+            for item in form.literals: recurse(item)
         elif form.isa(Implies): recurse(form.arg1); recurse(form.arg2)
         elif form.isa(Exists): recurse(form.body)
         elif form.isa(Forall): recurse(form.body)
@@ -286,11 +361,13 @@ def allFreeVars(form):
         if form.isa(Variable):
             if form not in boundVars: variables.append(form)
         elif form.isa(Constant): pass
-        elif form.isa(Atom):
+        elif form.isa(Function) or form.isa(Atom):
             for arg in form.args: recurse(arg, boundVars)
         elif form.isa(Not): recurse(form.arg, boundVars)
         elif form.isa(And): recurse(form.arg1, boundVars); recurse(form.arg2, boundVars)
         elif form.isa(Or): recurse(form.arg1, boundVars); recurse(form.arg2, boundVars)
+        elif form.isa(Clause):
+            for item in form.literals: recurse(item, boundVars)
         elif form.isa(Implies): recurse(form.arg1, boundVars); recurse(form.arg2, boundVars)
         elif form.isa(Exists): recurse(form.body, boundVars + [form.var])
         elif form.isa(Forall): recurse(form.body, boundVars + [form.var])
@@ -305,11 +382,14 @@ def substituteFreeVars(form, var, obj):
             if form == var: return obj
             return form
         elif form.isa(Constant): return form
+        elif form.isa(Function):
+            return Function(*[form.name] + [recurse(arg, boundVars) for arg in form.args])
         elif form.isa(Atom):
             return Atom(*[form.name] + [recurse(arg, boundVars) for arg in form.args])
         elif form.isa(Not): return Not(recurse(form.arg, boundVars))
         elif form.isa(And): return And(recurse(form.arg1, boundVars), recurse(form.arg2, boundVars))
         elif form.isa(Or): return Or(recurse(form.arg1, boundVars), recurse(form.arg2, boundVars))
+        elif form.isa(Clause): return OrList([recurse(item, boundVars) for item in form.literals])
         elif form.isa(Implies): return Implies(recurse(form.arg1, boundVars), recurse(form.arg2, boundVars))
         elif form.isa(Exists):
             if form.var == var: return form  # Don't substitute inside
@@ -323,6 +403,9 @@ def substituteFreeVars(form, var, obj):
 def allConstants(form):
     return [x for x in allSubexpressions(form) if x.isa(Constant)]
 
+def allPredicates(form):
+    return set(x.name for x in allSubexpressions(form) if x.isa(Atom))
+
 class ToCNFRule(UnaryRule):
     def __init__(self):
         # For standardizing variables.
@@ -330,6 +413,7 @@ class ToCNFRule(UnaryRule):
         self.varCounts = collections.Counter()
 
     def applyRule(self, form):
+        STATS.count('cnf_conversions')
         newForm = form
 
         # Step 1: remove implications
@@ -338,6 +422,7 @@ class ToCNFRule(UnaryRule):
             if form.isa(Not): return Not(removeImplications(form.arg))
             if form.isa(And): return And(removeImplications(form.arg1), removeImplications(form.arg2))
             if form.isa(Or): return Or(removeImplications(form.arg1), removeImplications(form.arg2))
+            if form.isa(Clause): return removeImplications(OrList(form.literals))
             if form.isa(Implies): return Or(Not(removeImplications(form.arg1)), removeImplications(form.arg2))
             if form.isa(Exists): return Exists(form.var, removeImplications(form.body))
             if form.isa(Forall): return Forall(form.var, removeImplications(form.body))
@@ -379,6 +464,7 @@ class ToCNFRule(UnaryRule):
                 if form not in subst: raise Exception("Free variable found: %s" % form)
                 return subst[form]
             if form.isa(Constant): return form
+            if form.isa(Function): return Function(*([form.name] + [standardizeVariables(arg, subst) for arg in form.args]))
             if form.isa(Atom): return Atom(*([form.name] + [standardizeVariables(arg, subst) for arg in form.args]))
             if form.isa(Not): return Not(standardizeVariables(form.arg, subst))
             if form.isa(And): return And(standardizeVariables(form.arg1, subst), standardizeVariables(form.arg2, subst))
@@ -396,6 +482,7 @@ class ToCNFRule(UnaryRule):
         def skolemize(form, subst, scope): 
             if form.isa(Variable): return subst.get(form, form)
             if form.isa(Constant): return form
+            if form.isa(Function): return Function(*[form.name] + [skolemize(arg, subst, scope) for arg in form.args])
             if form.isa(Atom): return Atom(*[form.name] + [skolemize(arg, subst, scope) for arg in form.args])
             if form.isa(Not): return Not(skolemize(form.arg, subst, scope))
             if form.isa(And): return And(skolemize(form.arg1, subst, scope), skolemize(form.arg2, subst, scope))
@@ -404,16 +491,14 @@ class ToCNFRule(UnaryRule):
                 # Create a Skolem function that depends on the variables in the scope (list of variables)
                 # Example:
                 # - Suppose scope = [$x, $y] and form = Exists($z,F($z)).
-                # - Normally, we would return F(Z($x,$y)), where Z is a brand new Skolem function.
-                # - But since we don't have function symbols, we replace with a Skolem predicate:
-                #   Forall($z,Implies(Z($z,$x,$y),F($z)))
-                #   Important: when doing resolution, need to catch Not(Z($z,*,*)) as a contradiction.
+                # - We return F(skolem$z($x,$y)), where skolem$z is a brand new function
+                #   (variables are standardized, so the name is unique).
+                # - With an empty scope, skolem$z is a constant.
                 if len(scope) == 0:
                     subst[form.var] = Constant('skolem' + form.var.name)
-                    return skolemize(form.body, subst, scope)
                 else:
-                    skolem = Atom(*['Skolem' + form.var.name, form.var] + scope)
-                    return Forall(form.var, Or(Not(skolem), skolemize(form.body, subst, scope)))
+                    subst[form.var] = Function(*['skolem' + form.var.name] + scope)
+                return skolemize(form.body, subst, scope)
             if form.isa(Forall):
                 return Forall(form.var, skolemize(form.body, subst, scope + [form.var]))
             raise Exception("Unhandled: %s" % form)
@@ -450,7 +535,7 @@ class ToCNFRule(UnaryRule):
 
         # Post-processing: break up conjuncts into conjuncts and sort the disjuncts in each conjunct
         # Remove instances of A and Not(A)
-        conjuncts = [OrList(reduceFormulas(flattenOr(f), Or)) for f in flattenAnd(newForm)]
+        conjuncts = [makeClause(flattenOr(f)) for f in flattenAnd(newForm)]
         #print rstr(form), rstr(conjuncts)
         assert len(conjuncts) > 0
         if any(x == AtomFalse for x in conjuncts): return [AtomFalse]
@@ -461,37 +546,98 @@ class ToCNFRule(UnaryRule):
         #print 'CNF', form, rstr(results)
         return results
 
+# Resolution strategies
+UNRESTRICTED = "unrestricted"  # Resolve on every pair of complementary literals
+ORDERED = "ordered"  # Only resolve on literals whose predicate is maximal in their clause
+SELECTION = "selection"  # Resolve on the selected negative literal of a clause against a positive clause
+SET_OF_SUPPORT = "sos"  # Every resolution involves the query: the KB only keeps the clauses it was told
+STRATEGIES = [UNRESTRICTED, ORDERED, SELECTION, SET_OF_SUPPORT]
+
+def literalAtom(item): return item.arg if item.isa(Not) else item
+
 class ResolutionRule(BinaryRule):
+    # strategy: one of STRATEGIES (SET_OF_SUPPORT is handled by the KnowledgeBase)
+    # precedence: predicate names from lowest to highest for ORDERED; other
+    # predicates are higher and compared by name.
+    def __init__(self, strategy=UNRESTRICTED, precedence=None):
+        if strategy not in STRATEGIES: raise Exception('Invalid strategy: %s' % strategy)
+        self.strategy = strategy
+        self.precedence = dict((name, i) for i, name in enumerate(precedence or []))
+
+    # Key of the predicate ordering. Atoms with the same predicate are incomparable.
+    def rank(self, item):
+        name = literalAtom(item).name
+        if name in self.precedence: return (1, self.precedence[name], name)
+        return (2, 0, name)
+
+    # Return the indices of the literals of |items| that may be resolved on.
+    def eligible(self, items):
+        if self.strategy == ORDERED:
+            ranks = [self.rank(item) for item in items]
+            top = max(ranks)
+            return set(i for i, r in enumerate(ranks) if r == top)
+        if self.strategy == SELECTION:
+            negatives = [i for i, item in enumerate(items) if item.isa(Not)]
+            # Select the highest negative literal (the first one on ties)
+            if negatives: return set([max(negatives, key=lambda i: (self.rank(items[i]), -i))])
+        return set(range(len(items)))
+
+    # With SELECTION, a clause without a selected literal is positive.
+    def isPositive(self, items, eligible):
+        return not any(items[i].isa(Not) for i in eligible)
+
     # Assume formulas are in CNF
     # Assume A and Not(A) don't both exist in a form (taken care of by CNF conversion)
     def applyRule(self, form1, form2):
+        results = []
+        # No literals to resolve on
+        if not complementary(signature(form1), signature(form2)): return results
         items1 = flattenOr(form1)
         items2 = flattenOr(form2)
-        results = []
+        restricted = self.strategy == ORDERED or self.strategy == SELECTION
+        if restricted:
+            eligible1 = self.eligible(items1)
+            eligible2 = self.eligible(items2)
+            if self.strategy == SELECTION:
+                positive1 = self.isPositive(items1, eligible1)
+                positive2 = self.isPositive(items2, eligible2)
+                # One side resolves on its selected literal, the other must be positive
+                if not positive1 and not positive2: return results
         #print 'RESOLVE', form1, form2
         for i, item1 in enumerate(items1):
+            if restricted and i not in eligible1: continue
             for j, item2 in enumerate(items2):
+                if restricted:
+                    if j not in eligible2: continue
+                    if self.strategy == SELECTION:
+                        if item1.isa(Not) and not positive2: continue
+                        if item2.isa(Not) and not positive1: continue
+                # Opposite signs, same predicate
+                if item1.isa(Not) == item2.isa(Not): continue
+                atom1, atom2 = literalAtom(item1), literalAtom(item2)
+                if atom1.name != atom2.name: continue
                 subst = {}
-                if unify(negateFormula(item1), item2, subst):
-                    newItems1 = withoutElementAt(items1, i)
-                    newItems2 = withoutElementAt(items2, j)
-                    newItems = [applySubst(item, subst) for item in newItems1 + newItems2]
+                if STATS.enabled: STATS.counters['unify_attempts'] += 1
+                if unify(atom1, atom2, subst):
+                    if STATS.enabled: STATS.counters['unify_successes'] += 1
+                    newItems = [applySubst(item, subst) for k, item in enumerate(items1) if k != i] + \
+                               [applySubst(item, subst) for k, item in enumerate(items2) if k != j]
 
+                    if STATS.enabled: STATS.counters['resolvents_generated'] += 1
                     if len(newItems) == 0:  # Contradiction: False
                         results = [AtomFalse]
                         break
 
                     #print 'STEP: %s %s => %s %s' % (form1, form2, rstr(newItems), rstr(subst))
-                    result = OrList(reduceFormulas(newItems, Or))
-
-                    # Not(Skolem$x($x,...)) is a contradiction
-                    if isinstance(result, Not) and result.arg.name.startswith('Skolem'):
-                        results = [AtomFalse]
-                        break
+                    result = makeClause(newItems)
 
                     # Don't add redundant stuff
-                    if result == AtomTrue: continue
-                    if result in results: continue
+                    if result == AtomTrue:
+                        STATS.count('dropped_tautology')
+                        continue
+                    if result in results:
+                        STATS.count('dropped_duplicate')
+                        continue
 
                     results.append(result)
             if results == [AtomFalse]: break
@@ -500,13 +646,172 @@ class ResolutionRule(BinaryRule):
         return results
     def symmetric(self): return True
 
+############################################################
+# Subsumption
+
+# One-way unification: bind the variables of |pattern| (never those of
+# |instance|) so that it becomes |instance|.  Mutates |subst|.
+def match(pattern, instance, subst):
+    if pattern.isa(Variable):
+        if pattern in subst: return subst[pattern] == instance
+        subst[pattern] = instance
+        return True
+    if pattern.isa(Constant): return pattern == instance
+    if pattern.isa(Function) or pattern.isa(Atom):
+        return instance.isa(type(pattern)) and pattern.name == instance.name and len(pattern.args) == len(instance.args) and \
+            all(match(pattern.args[i], instance.args[i], subst) for i in range(len(pattern.args)))
+    if pattern.isa(Not):
+        return instance.isa(Not) and match(pattern.arg, instance.arg, subst)
+    raise Exception('Unhandled: %s' % pattern)
+
+# Return whether clause |form1| subsumes clause |form2|: some substitution
+# maps the literals of |form1| to distinct literals of |form2|.  There is no
+# factoring, so two literals may not collapse onto one (R(x,x) | R(a,x) doesn't
+# subsume R(a,a)), and only clauses that are at most as long count.
+def subsumes(form1, form2): return subsumesItems(flattenOr(form1), flattenOr(form2))
+
+def subsumesItems(items1, items2):
+    if len(items1) > len(items2): return False
+    used = [False] * len(items2)  # Literals of |items2| already mapped to
+    def recurse(i, subst):
+        if i == len(items1): return True
+        for j, item2 in enumerate(items2):
+            if used[j]: continue
+            newSubst = dict(subst)
+            if not match(items1[i], item2, newSubst): continue
+            used[j] = True
+            found = recurse(i + 1, newSubst)
+            used[j] = False
+            if found: return True
+        return False
+    return recurse(0, {})
+
+# Clauses indexed by their signed predicates (see signature), for subsumption
+# candidates: a clause can only subsume clauses whose signature contains its own.
+class ClauseStore:
+    def __init__(self):
+        self.items = {}  # Map from key to its literals
+        self.features = {}  # Map from key to features
+        self.index = collections.defaultdict(set)  # Map from feature to keys
+    def __len__(self): return len(self.features)
+
+    def add(self, key):
+        self.items[key] = flattenOr(key)
+        features = self.features[key] = signature(key)
+        for feature in features: self.index[feature].add(key)
+
+    def remove(self, key):
+        features = self.features.pop(key, None)
+        if features == None: return
+        del self.items[key]
+        for feature in features: self.index[feature].discard(key)
+
+    # Return a stored clause accepted by |keep| that subsumes |form|, or None.
+    def subsumer(self, form, keep=lambda key: True):
+        items = flattenOr(form)
+        features = signature(form)
+        candidates = set()
+        for feature in features: candidates |= self.index.get(feature, set())
+        for key in candidates:
+            if self.features[key] <= features and keep(key) and subsumesItems(self.items[key], items): return key
+        return None
+
+    # Return the stored clauses that |form| subsumes.
+    def subsumed(self, form):
+        items = flattenOr(form)
+        features = signature(form)
+        candidates = min((self.index.get(feature, set()) for feature in features), key=len)
+        return [key for key in candidates if key != form and features <= self.features[key] and subsumesItems(items, self.items[key])]
+
 ############################################################
 # Model checking
 
+# Return |form| with its constants renamed by |perm| (map from Constant to Constant).
+def permuteConstants(form, perm):
+    if form.isa(Variable): return form
+    if form.isa(Constant): return perm.get(form, form)
+    if form.isa(Function): return Function(*[form.name] + [permuteConstants(arg, perm) for arg in form.args])
+    if form.isa(Atom): return Atom(*[form.name] + [permuteConstants(arg, perm) for arg in form.args])
+    if form.isa(Not): return Not(permuteConstants(form.arg, perm))
+    if form.isa(And): return And(permuteConstants(form.arg1, perm), permuteConstants(form.arg2, perm))
+    if form.isa(Or): return Or(permuteConstants(form.arg1, perm), permuteConstants(form.arg2, perm))
+    if form.isa(Clause): return OrList([permuteConstants(item, perm) for item in form.literals])
+    if form.isa(Implies): return Implies(permuteConstants(form.arg1, perm), permuteConstants(form.arg2, perm))
+    if form.isa(Exists): return Exists(form.var, permuteConstants(form.body, perm))
+    if form.isa(Forall): return Forall(form.var, permuteConstants(form.body, perm))
+    raise Exception("Unhandled: %s" % form)
+
+# Return a string for |form| that does not depend on the order of the operands
+# of And and Or (nor on how they are nested).
+def canonicalStr(form):
+    if form.isa(Not): return 'Not(%s)' % canonicalStr(form.arg)
+    if form.isa(And): return 'And(%s)' % ','.join(sorted(canonicalStr(item) for item in flattenAnd(form)))
+    if form.isa(Or) or form.isa(Clause): return 'Or(%s)' % ','.join(sorted(canonicalStr(item) for item in flattenOr(form)))
+    if form.isa(Implies): return 'Implies(%s,%s)' % (canonicalStr(form.arg1), canonicalStr(form.arg2))
+    if form.isa(Exists): return 'Exists(%s,%s)' % (form.var, canonicalStr(form.body))
+    if form.isa(Forall): return 'Forall(%s,%s)' % (form.var, canonicalStr(form.body))
+    return str(form)
+
+# Group |objects| into classes of interchangeable objects (only classes of 2 or more).
+# Two objects are interchangeable if swapping them maps the set of |forms| onto
+# itself; quantifiers range over all the objects, so the grounded formulas are
+# then symmetric too.  Swaps of every object of a class with its first object
+# generate all the permutations of the class.
+def objectSymmetries(forms, objects):
+    formSet = set(canonicalStr(form) for form in forms)
+    classes = []
+    for obj in objects:
+        for objectClass in classes:
+            swap = {obj: objectClass[0], objectClass[0]: obj}
+            if set(canonicalStr(permuteConstants(form, swap)) for form in forms) == formSet:
+                objectClass.append(obj)
+                break
+        else:
+            classes.append([obj])
+    return [objectClass for objectClass in classes if len(objectClass) > 1]
+
+# Return the models obtained by permuting the objects of each class in every way.
+def expandOrbits(models, classes):
+    perms = [{}]
+    for objectClass in classes:
+        perms = [dict(list(perm.items()) + list(zip(objectClass, order))) for perm in perms
+                 for order in itertools.permutations(objectClass)]
+    seen = set()
+    result = []
+    for model in models:
+        for perm in perms:
+            newModel = frozenset(permuteConstants(atom, perm) for atom in model)
+            if newModel not in seen:
+                seen.add(newModel)
+                result.append(set(newModel))
+    return result
+
 # Return the set of models
-def performModelChecking(allForms, findAll, objects=None, verbose=0):
+# symmetry: only search for one model per orbit of the interchangeable objects
+# (see objectSymmetries), by adding lex-leader constraints.  With findAll, the
+# orbits are then expanded, so the result is the same set of models.
+# facts: map from ground Atom to its truth value, conjoined with |allForms|.
+# They are evaluated into the formulas before planning, so the search doesn't
+# branch on them; the true ones are added to every model.  The other atoms that
+# this simplifies away are unconstrained: with findAll they are still searched,
+# so that the models are the same as with the facts as formulas; otherwise they
+# are just False in the model.
+def performModelChecking(allForms, findAll, objects=None, verbose=0, symmetry=False, facts=None):
     if verbose >= 3:
         print(('performModelChecking', rstr(allForms)))
+    facts = facts or {}
+    factForms = [atom if value else Not(atom) for atom, value in facts.items()]
+    trueFacts = set(atom for atom, value in facts.items() if value)
+    if objects == None and facts:
+        # Same domain as if the facts were formulas
+        objects = list(set(x for form in allForms + factForms for x in allConstants(form)))
+    classes = []
+    if symmetry:
+        constants = [toExpr(obj) for obj in objects] if objects != None else \
+            sorted(set(x for form in allForms for x in allConstants(form)), key=str)
+        classes = objectSymmetries(allForms + factForms, constants)
+        if verbose >= 3:
+            print(('Interchangeable objects:', rstr(classes)))
     # Propositionalize, convert to CNF, dedup
     allForms = propositionalize(allForms, objects)
     # Convert to CNF: actually makes things slower
@@ -515,16 +820,24 @@ def performModelChecking(allForms, findAll, objects=None, verbose=0):
     #if all(x == AtomTrue for x in allForms): return [set()]
     #allForms = [x for x in allForms if x != AtomTrue]
     #allForms = reduceFormulas(allForms, And)
-    allForms = [universalInterpret(form) for form in allForms]
+    freeAtoms = set()  # Atoms of |allForms| that only vanish because of the facts
+    if facts:
+        # Like without facts, forms that are False by themselves are dropped
+        allForms = [form for form in map(universalInterpret, allForms) if form != AtomFalse]
+        if findAll:
+            freeAtoms = set(f for form in allForms if form != AtomTrue for f in allSubexpressions(form) if f.isa(Atom))
+            freeAtoms -= set(facts)
+    allForms = [universalInterpret(form, facts) for form in allForms]
+    if facts and AtomFalse in allForms: return []  # Contradicts a fact
     allForms = list(set(allForms) - set([AtomTrue, AtomFalse]))
     if verbose >= 3:
         print(('All Forms:', rstr(allForms)))
 
-    if allForms == []: return [set()]  # One model
+    if allForms == [] and not freeAtoms: return [set(trueFacts)]  # One model
     if allForms == [AtomFalse]: return []  # No models
 
     # Atoms are the variables
-    atoms = set()
+    atoms = set(freeAtoms)
     for form in allForms:
         for f in allSubexpressions(form):
             if f.isa(Atom): atoms.add(f)
@@ -560,24 +873,55 @@ def performModelChecking(allForms, findAll, objects=None, verbose=0):
             print(("  %s: %s" % (rstr(atom), rstr(forms))))
     assert sum(len(forms) for atom, forms in atomPrefixForms) == len(allForms)
 
-    # Build up an interpretation
+    # Lex-leader constraints: for each swap of two neighbors in a class of
+    # interchangeable objects, the assignment (in atom order, False < True) must
+    # not be greater than its image under the swap.  The smallest model of
+    # every orbit satisfies them all.
     N = len(atoms)
+    atomIndex = dict((atom, k) for k, atom in enumerate(atoms))
+    swaps = []  # For each swap, the index of the image of each atom
+    for objectClass in classes:
+        for a, b in zip(objectClass, objectClass[1:]):
+            image = [atomIndex.get(permuteConstants(atom, {a: b, b: a})) for atom in atoms]
+            if None not in image: swaps.append(image)
+    values = [None] * N  # Value of each assigned atom
+    def lexLeader(i): # atoms 0..i are assigned
+        for image in swaps:
+            for k in range(i + 1):
+                j = image[k]
+                if j > i: break  # Not decided yet
+                if values[k] != values[j]:
+                    if values[k]: return False
+                    break
+        return True
+
+    # Build up an interpretation
     models = []  # List of models which are true
     model = set()  # Set of true atoms, mutated over time
     def recurse(i): # i: atom index
         if not findAll and len(models) > 0: return
+        if STATS.enabled: STATS.counters['mc_nodes'] += 1
         if i == N:  # Found a model on which the formulas are true
             models.append(set(model))
             return
         atom, forms = atomPrefixForms[i]
         result = universalInterpretAtom(atom)
         if result == None or result == False:
-            if interpretForms(forms, model): recurse(i+1)
+            values[i] = False
+            if interpretForms(forms, model) and lexLeader(i): recurse(i+1)
+            elif STATS.enabled: STATS.counters['mc_backtracks'] += 1
         if result == None or result == True:
+            values[i] = True
             model.add(atom)
-            if interpretForms(forms, model): recurse(i+1)
+            if interpretForms(forms, model) and lexLeader(i): recurse(i+1)
+            elif STATS.enabled: STATS.counters['mc_backtracks'] += 1
             model.remove(atom)
-    recurse(0)
+    with STATS.timer('model_checking_search'):
+        recurse(0)
+    # The orbits are those of whole models, facts included
+    for model in models: model |= trueFacts
+    if findAll and classes:
+        models = expandOrbits(models, classes)
 
     if verbose >= 5:
         print('Models:')
@@ -586,6 +930,133 @@ def performModelChecking(allForms, findAll, objects=None, verbose=0):
 
     return models
 
+# Return the number of models of |allForms|, i.e. len(performModelChecking(allForms, findAll=True, objects)),
+# without building them.  The formulas are split into components that share no
+# atom, whose counts multiply; the count of each component is cached, since
+# different branches often leave the same residual formulas.
+def countModels(allForms, objects=None):
+    allForms = [universalInterpret(form) for form in propositionalize(allForms, objects)]
+    if any(form == AtomFalse for form in allForms): return 0
+    allForms = set(allForms) - set([AtomTrue])
+
+    # Compile to tuples over atom indices: ('~', f), ('&', f, ...), ('|', f, ...)
+    atomIndex = {}
+    def compile(form):
+        if form.isa(Atom): return atomIndex.setdefault(form, len(atomIndex))
+        if form.isa(Not): return ('~', compile(form.arg))
+        if form.isa(And): return ('&',) + tuple(compile(arg) for arg in flattenAnd(form))
+        if form.isa(Or): return ('|',) + tuple(compile(arg) for arg in flattenOr(form))
+        if form.isa(Implies): return ('|', ('~', compile(form.arg1)), compile(form.arg2))
+        raise Exception("Unhandled: %s" % form)
+    forms = frozenset(compile(form) for form in allForms)
+
+    atomsCache = {}
+    def atomsOf(f):
+        if isinstance(f, int): return frozenset([f])
+        result = atomsCache.get(f)
+        if result == None:
+            result = atomsCache[f] = frozenset().union(*[atomsOf(arg) for arg in f[1:]])
+        return result
+
+    # Set atom |i| to |value| in |f| and simplify; returns True, False or a formula
+    def condition(f, i, value):
+        if isinstance(f, int): return value if f == i else f
+        if i not in atomsOf(f): return f
+        if f[0] == '~':
+            arg = condition(f[1], i, value)
+            return (not arg) if isinstance(arg, bool) else ('~', arg)
+        # And: False absorbs, True is dropped; Or is the dual
+        absorb = f[0] == '|'
+        args = []
+        for arg in f[1:]:
+            arg = condition(arg, i, value)
+            if arg is absorb: return absorb
+            if arg is not (not absorb): args.append(arg)
+        if len(args) == 0: return not absorb
+        if len(args) == 1: return args[0]
+        return (f[0],) + tuple(args)
+
+    # Connected components of |forms| through shared atoms
+    def components(forms):
+        groups = []  # List of (atoms, forms)
+        for f in forms:
+            atoms, group = atomsOf(f), [f]
+            for other in [g for g in groups if not g[0].isdisjoint(atoms)]:
+                groups.remove(other)
+                atoms, group = atoms | other[0], group + other[1]
+            groups.append((atoms, group))
+        return [(atoms, frozenset(group)) for atoms, group in groups]
+
+    # Number of assignments to the atoms of |forms| that satisfy them all
+    cache = {}
+    def count(forms):
+        result = 1
+        for atoms, component in components(forms):
+            result *= countComponent(atoms, component)
+            if result == 0: break
+        return result
+    def countComponent(atoms, forms):
+        if forms in cache:
+            if STATS.enabled: STATS.counters['mc_cache_hits'] += 1
+            return cache[forms]
+        if STATS.enabled: STATS.counters['mc_nodes'] += 1
+        # Branch on the atom in the most formulas
+        occurrences = collections.Counter(i for f in forms for i in atomsOf(f))
+        i = max(occurrences, key=lambda i: (occurrences[i], -i))
+        total = 0
+        for value in (False, True):
+            residual = set()
+            for f in forms:
+                f = condition(f, i, value)
+                if f is False: break
+                if f is not True: residual.add(f)
+            else:
+                residual = frozenset(residual)
+                # Atoms that no residual formula mentions are unconstrained
+                free = len(atoms) - 1 - len(frozenset().union(*[atomsOf(f) for f in residual]))
+                total += count(residual) * 2 ** free
+                continue
+            if STATS.enabled: STATS.counters['mc_backtracks'] += 1
+        cache[forms] = total
+        return total
+
+    with STATS.timer('model_counting'):
+        return count(forms)
+
+# Compare the models of |forms| with a stored ModelSet (see modelset.py) as
+# integer rows, without building sorted tuples of atom strings.
+# Returns (missing, extra):
+# - missing: rows of |modelSet| that are not models of |forms|
+# - extra: models of |forms| that are not in |modelSet|
+# With NumPy, the stored rows are checked column-wise and the models of |forms|
+# are only enumerated if countModels says that some of them are not stored.
+def compareModelSet(forms, modelSet, objects=None):
+    import modelset
+    if objects == None: objects = modelSet.objects
+    if modelset.np != None:
+        allForms = [universalInterpret(form) for form in propositionalize(forms, objects)]
+        # performModelChecking ignores AtomFalse, which countModels doesn't
+        if AtomFalse not in allForms:
+            allForms = [form for form in allForms if form != AtomTrue]
+            atoms = set(str(f) for form in allForms for f in allSubexpressions(form) if f.isa(Atom))
+            bits = modelSet.bitMatrix()
+            # A row is a model if it satisfies |allForms| and only uses their atoms
+            valid = ~bits[:, [i for i, atom in enumerate(modelSet.atoms) if atom not in atoms]].any(axis=1)
+            for form in allForms: valid &= interpretFormRows(form, lambda atom: modelSet.column(bits, atom))
+            missing = modelSet.toInts(modelSet.rowArray()[~valid])
+            if countModels(forms, objects) == len(modelSet) - len(missing): return missing, []
+    predModels = performModelChecking(forms, findAll=True, objects=objects)
+    predRows = set()
+    extra = []
+    for model in predModels:
+        row = modelSet.encode(model)
+        if row == None: extra.append(model)  # Uses an atom the stored models never use
+        else: predRows.add(row)
+    targetRows = modelSet.rowSet()
+    missing = sorted(targetRows - predRows)
+    extra += [set(modelSet.decode(row)) for row in sorted(predRows - targetRows)]
+    return missing, extra
+
 # A model is a set of atoms.
 def printModel(model):
     for x in sorted(map(str, model)):
@@ -618,11 +1089,13 @@ def propositionalize(forms, objects=None):
             if form not in subst: raise Exception("Free variable found: %s" % form)
             return subst[form]
         if form.isa(Constant): return form
+        if form.isa(Function): raise Exception("Function terms can't be grounded over the objects: %s" % form)
         if form.isa(Atom):
             return Atom(*[form.name] + [convert(arg, subst) for arg in form.args])
         if form.isa(Not): return Not(convert(form.arg, subst))
         if form.isa(And): return And(convert(form.arg1, subst), convert(form.arg2, subst))
         if form.isa(Or): return Or(convert(form.arg1, subst), convert(form.arg2, subst))
+        if form.isa(Clause): return OrList([convert(item, subst) for item in form.literals])
         if form.isa(Implies): return Implies(convert(form.arg1, subst), convert(form.arg2, subst))
         if form.isa(Exists):
             return OrList([convert(form.body, dict(list(subst.items()) + [(form.var, obj)])) for obj in objects])
@@ -641,45 +1114,48 @@ def propositionalize(forms, objects=None):
     return newForms
 
 # Some atoms have a fixed value, so we should just evaluate them.
+# facts: map from ground Atom to its known truth value (see groundFact).
 # Assumption: atom is propositional logic.
-def universalInterpretAtom(atom):
+def universalInterpretAtom(atom, facts=None):
     if atom.name == 'Equals':
         return AtomTrue if atom.args[0] == atom.args[1] else AtomFalse
+    if facts: return facts.get(atom)
     return None
 
-# Reduce the expression (e.g., Equals(a,a) => True)
+# Reduce the expression (e.g., Equals(a,a) => True), also replacing the atoms of
+# |facts| with their values.
 # Assumption: atom is propositional logic.
-def universalInterpret(form):
+def universalInterpret(form, facts=None):
     if form.isa(Variable): return form
     if form.isa(Constant): return form
     if form.isa(Atom):
-        result = universalInterpretAtom(form)
+        result = universalInterpretAtom(form, facts)
         if result != None: return result
         return Atom(*[form.name] + [universalInterpret(arg) for arg in form.args])
     if form.isa(Not):
-        arg = universalInterpret(form.arg)
+        arg = universalInterpret(form.arg, facts)
         if arg == AtomTrue: return AtomFalse
         if arg == AtomFalse: return AtomTrue
         return Not(arg)
     if form.isa(And):
-        arg1 = universalInterpret(form.arg1)
-        arg2 = universalInterpret(form.arg2)
+        arg1 = universalInterpret(form.arg1, facts)
+        arg2 = universalInterpret(form.arg2, facts)
         if arg1 == AtomFalse: return AtomFalse
         if arg2 == AtomFalse: return AtomFalse
         if arg1 == AtomTrue: return arg2
         if arg2 == AtomTrue: return arg1
         return And(arg1, arg2)
     if form.isa(Or):
-        arg1 = universalInterpret(form.arg1)
-        arg2 = universalInterpret(form.arg2)
+        arg1 = universalInterpret(form.arg1, facts)
+        arg2 = universalInterpret(form.arg2, facts)
         if arg1 == AtomTrue: return AtomTrue
         if arg2 == AtomTrue: return AtomTrue
         if arg1 == AtomFalse: return arg2
         if arg2 == AtomFalse: return arg1
         return Or(arg1, arg2)
     if form.isa(Implies):
-        arg1 = universalInterpret(form.arg1)
-        arg2 = universalInterpret(form.arg2)
+        arg1 = universalInterpret(form.arg1, facts)
+        arg2 = universalInterpret(form.arg2, facts)
         if arg1 == AtomFalse: return AtomTrue
         if arg2 == AtomTrue: return AtomTrue
         if arg1 == AtomTrue: return arg2
@@ -687,6 +1163,14 @@ def universalInterpret(form):
         return Implies(arg1, arg2)
     raise Exception("Unhandled: %s" % form)
 
+# Return (atom, value) if |form| is a ground literal other than Equals, else None.
+# Example: Not(Liar(john)) => (Liar(john), False)
+def groundFact(form):
+    atom = form.arg if form.isa(Not) else form
+    if not atom.isa(Atom) or atom.name == 'Equals': return None
+    if not all(arg.isa(Constant) for arg in atom.args): return None
+    return (atom, not form.isa(Not))
+
 def interpretForm(form, model):
     if form.isa(Atom): return form in model
     if form.isa(Not): return not interpretForm(form.arg, model)
@@ -699,6 +1183,16 @@ def interpretForm(form, model):
 def interpretForms(forms, model):
     return all(interpretForm(form, model) for form in forms)
 
+# Interpret |form| in many models at once: |column(atom)| is a boolean array
+# (e.g., NumPy) of the value of |atom| in each model.
+def interpretFormRows(form, column):
+    if form.isa(Atom): return column(form)
+    if form.isa(Not): return ~interpretFormRows(form.arg, column)
+    if form.isa(And): return interpretFormRows(form.arg1, column) & interpretFormRows(form.arg2, column)
+    if form.isa(Or): return interpretFormRows(form.arg1, column) | interpretFormRows(form.arg2, column)
+    if form.isa(Implies): return ~interpretFormRows(form.arg1, column) | interpretFormRows(form.arg2, column)
+    raise Exception("Unhandled: %s" % form)
+
 ############################################################
 
 # A Derivation is a tree where each node corresponds to the application of a rule.
@@ -773,8 +1267,9 @@ def showKBResponse(response, verbose=1):
 # - addRule: add inference rules
 # - tell: modify the KB with a new formula.
 # - ask: query the KB about 
+# Answers to ask() are cached until a tell() changes the KB.
 class KnowledgeBase:
-    def __init__(self, standardizationRule, rules, modelChecking, verbose=0):
+    def __init__(self, standardizationRule, rules, modelChecking, verbose=0, cacheSize=128, fineInvalidation=False, setOfSupport=False, subsumption=False, symmetry=False):
         # Rule to apply to each formula that's added to the KB (None is possible).
         self.standardizationRule = standardizationRule
 
@@ -783,6 +1278,16 @@ class KnowledgeBase:
 
         # Use model checking as opposed to applying rules.
         self.modelChecking = modelChecking
+        # Break the symmetries of interchangeable objects while model checking.
+        self.symmetry = symmetry
+        # Ground literals of the KB (model checking only), which are also in
+        # |derivations|: map from Atom to its truth value.
+        # Model checking evaluates them into the other formulas.
+        self.facts = {}
+
+        # Only keep the formulas told by the user, not what was derived while
+        # checking them, so that every later derivation involves the query.
+        self.setOfSupport = setOfSupport
 
         # For debugging
         self.verbose = verbose 
@@ -790,14 +1295,45 @@ class KnowledgeBase:
         # Formulas that we believe are true (used when not doing model checking).
         self.derivations = {}  # Map from Derivation key (logical form) to Derivation
 
+        # Drop clauses subsumed by a clause of the KB, and retire the clauses
+        # that a new clause subsumes (requires clauses, i.e. CNF).
+        self.subsumption = subsumption
+        self.store = ClauseStore()
+
+        # Bumped every time tell() changes the KB.
+        self.version = 0
+
+        # Cached ask() responses, least recently used first.
+        # Map from query key (logical form) to (version, predicates, response)
+        self.cacheSize = cacheSize
+        self.askCache = collections.OrderedDict()
+        # If set, a tell() only invalidates the cached queries whose predicates
+        # are connected (through the KB) to the predicates of the new formula.
+        # Example models of the kept responses then predate that tell().
+        self.fineInvalidation = fineInvalidation
+
     # Add a formula |form| to the KB if it doesn't contradict.  Returns a KBResponse.
     def tell(self, form):
-        return self.query(form, modify=True)
+        oldConstants = self.allKBConstants() if self.fineInvalidation else None
+        response = self.query(form, modify=True)
+        if response.status == CONTINGENT: self.bumpVersion(form, oldConstants)
+        return response
 
     # Ask whether the logical formula |form| is True, False, or unknown based
     # on the KB.  Returns a KBResponse.
     def ask(self, form):
-        return self.query(form, modify=False)
+        key = str(form)
+        entry = self.askCache.get(key)
+        if entry != None and entry[0] == self.version:
+            self.askCache.move_to_end(key)
+            return entry[2]
+        response = self.query(form, modify=False)
+        predicates = self.connectedPredicates(form) if self.fineInvalidation else None
+        self.askCache[key] = (self.version, predicates, response)
+        self.askCache.move_to_end(key)
+        while len(self.askCache) > self.cacheSize:
+            self.askCache.popitem(last=False)
+        return response
 
     def dump(self):
         print(('==== Knowledge base [%d derivations] ===' % len(self.derivations)))
@@ -806,9 +1342,48 @@ class KnowledgeBase:
 
     ####### Internal functions
 
+    # Called after |form| was added to the KB, which had |oldConstants| before.
+    def bumpVersion(self, form, oldConstants):
+        oldVersion = self.version
+        self.version += 1
+        if not self.fineInvalidation:
+            self.askCache.clear()
+            return
+        # New objects change the domain of every quantifier.
+        newConstants = set(allConstants(form)) - oldConstants
+        newPredicates = allPredicates(form)
+        for key, (version, predicates, response) in list(self.askCache.items()):
+            if version == oldVersion and not newConstants and predicates.isdisjoint(newPredicates):
+                self.askCache[key] = (self.version, predicates, response)
+            else:
+                del self.askCache[key]
+
+    def allKBConstants(self):
+        constants = set()
+        for deriv in list(self.derivations.values()):
+            constants |= set(allConstants(deriv.form))
+        return constants
+
+    # Return the predicates of |form| and of every formula in the KB that is
+    # connected to it through shared predicates.
+    def connectedPredicates(self, form):
+        predicates = allPredicates(form)
+        formPredicates = [allPredicates(deriv.form) for deriv in list(self.derivations.values())]
+        changed = True
+        while changed:
+            changed = False
+            for other in formPredicates:
+                if not other <= predicates and not other.isdisjoint(predicates):
+                    predicates |= other
+                    changed = True
+        return predicates
+
     # Returns a KBResponse or if there are free variables, a mapping from (var, obj) => query without that variable.
     def query(self, form, modify):
         #print 'QUERY', form
+        # Model checking grounds over the objects, which function terms are not
+        if self.modelChecking and any(f.isa(Function) for f in allSubexpressions(form)):
+            raise Exception("Model checking can't interpret function terms (e.g., Skolem functions): %s" % form)
         # Handle wh-queries: try all possible values of the free variable, and recurse on query().
         freeVars = allFreeVars(form)
         if len(freeVars) > 0:
@@ -880,28 +1455,63 @@ class KnowledgeBase:
         key = deriv.form
         oldDeriv = self.derivations.get(key)
         maxCost = 100
+        if STATS.enabled:
+            if oldDeriv != None: STATS.counters['dropped_duplicate'] += 1
+            elif deriv.cost > maxCost: STATS.counters['dropped_cost'] += 1
+            else: STATS.counters['resolvents_kept' if deriv.derived else 'axioms_added'] += 1
         if oldDeriv == None and deriv.cost <= maxCost:
         #if oldDeriv == None or (deriv.cost < oldDeriv.cost and (deriv.permanent >= oldDeriv.permanent)):
             #print 'UPDATE %s %s' % (deriv, oldDeriv)
             #self.dump()
+            if self.subsumption and not self.storeClause(deriv): return True
             # Something worth updating
             self.derivations[key] = deriv
             if self.verbose >= 3: print(('add %s [%s derivations]' % (deriv, len(self.derivations))))
 
             if self.modelChecking:
-                allForms = [deriv.form for deriv in list(self.derivations.values())]
-                models = performModelChecking(allForms, findAll=False, verbose=self.verbose)
+                fact = groundFact(deriv.form)
+                if fact != None:
+                    atom, value = fact
+                    if self.facts.get(atom, value) != value: return False
+                    self.facts[atom] = value
+                allForms = [deriv.form for deriv in list(self.derivations.values()) if groundFact(deriv.form) == None]
+                models = performModelChecking(allForms, findAll=False, verbose=self.verbose, symmetry=self.symmetry, facts=self.facts)
                 if len(models) == 0: return False
                 else: self.consistentModel = models[0]
 
             # Apply rules forward
             if not self.applyUnaryRules(deriv): return False
             for key2, deriv2 in list(self.derivations.items()):
+                if self.derivations.get(key2) is not deriv2: continue  # Retired meanwhile
                 if not self.applyBinaryRules(deriv, deriv2): return False
                 if not self.applyBinaryRules(deriv2, deriv): return False
 
         return True
 
+    # How long a Derivation stays in the KB: 2 if permanent, 1 if it will be
+    # made permanent, 0 if it is dropped at the end of the query.
+    def lifetime(self, deriv):
+        if deriv.permanent: return 2
+        return 0 if self.setOfSupport and deriv.derived else 1
+
+    # Forward and backward subsumption of a new Derivation.  Return whether it
+    # is kept.  A clause only replaces clauses that don't outlive it, so
+    # permanent ones are retired by makeTemporaryPermanent().
+    def storeClause(self, deriv):
+        lifetime = self.lifetime(deriv)
+        if self.store.subsumer(deriv.form, lambda key: self.lifetime(self.derivations[key]) >= lifetime) != None:
+            STATS.count('dropped_subsumed')
+            return False
+        for key in self.store.subsumed(deriv.form):
+            if self.lifetime(self.derivations[key]) <= lifetime: self.removeDerivation(key)
+        self.store.add(deriv.form)
+        return True
+
+    def removeDerivation(self, key):
+        STATS.count('retired_subsumed')
+        del self.derivations[key]
+        self.store.remove(key)
+
     # Raise an exception if |formulas| is not a list of Formulas.
     def ensureFormulas(self, rule, formulas):
         if isinstance(formulas, list) and all(formula == False or isinstance(formula, Formula) for formula in formulas):
@@ -922,6 +1532,7 @@ class KnowledgeBase:
         for rule in self.rules:
             if not isinstance(rule, BinaryRule): continue
             if rule.symmetric() and str(deriv1.form) >= str(deriv2.form): continue  # Optimization
+            if STATS.enabled: STATS.counters['pairs_tried'] += 1
             for newForm in self.ensureFormulas(rule, rule.applyRule(deriv1.form, deriv2.form)):
                 if not self.addDerivation(Derivation(newForm, children = [deriv1, deriv2], cost = deriv1.cost + deriv2.cost + 1, derived = True)):
                     return False
@@ -932,15 +1543,33 @@ class KnowledgeBase:
         for key, value in list(self.derivations.items()):
             if not value.permanent:
                 del self.derivations[key]
+                self.store.remove(key)
+                fact = groundFact(key) if self.modelChecking else None
+                if fact != None and self.facts.get(fact[0]) == fact[1]: del self.facts[fact[0]]
 
     # Mark all the derivations marked temporary to permanent.
     def makeTemporaryPermanent(self):
-        for deriv in list(self.derivations.values()):
+        newKeys = []
+        for key, deriv in list(self.derivations.items()):
+            if self.setOfSupport and deriv.derived and not deriv.permanent:
+                del self.derivations[key]
+                self.store.remove(key)
+                continue
+            if not deriv.permanent: newKeys.append(key)
             deriv.permanent = True
+        if self.subsumption:
+            for key in newKeys:
+                if key not in self.derivations: continue
+                for other in self.store.subsumed(key): self.removeDerivation(other)
 
 # Create an empty knowledge base equipped with the usual inference rules.
-def createResolutionKB():
-    return KnowledgeBase(standardizationRule = ToCNFRule(), rules = [ResolutionRule()], modelChecking = False)
-
-def createModelCheckingKB():
-    return KnowledgeBase(standardizationRule = None, rules = [], modelChecking = True)
+# strategy: one of STRATEGIES, see ResolutionRule.
+# subsumption: keep the clause store free of subsumed clauses (off by default,
+# since it changes which clauses are derived and dumped).
+def createResolutionKB(strategy=UNRESTRICTED, precedence=None, subsumption=False):
+    return KnowledgeBase(standardizationRule = ToCNFRule(), rules = [ResolutionRule(strategy, precedence)], modelChecking = False,
+                         setOfSupport = strategy == SET_OF_SUPPORT, subsumption = subsumption)
+
+# symmetry: see performModelChecking.
+def createModelCheckingKB(symmetry=False):
+    return KnowledgeBase(standardizationRule = None, rules = [], modelChecking = True, symmetry = symmetry)
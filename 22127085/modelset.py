@@ -0,0 +1,214 @@
+# Compact model sets: every model is a row of bits over a fixed atom table.
+#
+# File layout (little-endian):
+# - magic 'LMS1', number of atoms, words per row (uint32 each), number of rows (uint64)
+# - length (uint32) + newline separated utf-8 object names, then the same for atom names
+# - zero padding up to a multiple of 8 bytes
+# - the rows, sorted, each |wordsPerRow| uint64 words (least significant word first)
+# The rows are read straight from a memory map.
+#
+# With NumPy, the rows are a (numRows, wordsPerRow) uint64 array viewing the
+# map and set differences are vectorized; without it, they are Python ints.
+
+import gzip, mmap, pickle, struct
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b'LMS1'
+HEADER = struct.Struct('<4sIIQ')
+LENGTH = struct.Struct('<I')
+
+class ModelSet:
+    # objects: names of the objects used to ground the formulas
+    # atoms: atom names (str(atom)), bit i of a row is atoms[i]
+    # rows: sorted list of ints, or None if the rows are still in |buffer|
+    def __init__(self, objects, atoms, rows=None, buffer=None, offset=0, numRows=0):
+        self.objects = list(objects)
+        self.atoms = list(atoms)
+        self.atomIndex = dict((atom, i) for i, atom in enumerate(self.atoms))
+        self.wordsPerRow = max(1, (len(self.atoms) + 63) // 64)
+        self.rows = rows
+        self.buffer = buffer
+        self.offset = offset
+        self.numRows = len(rows) if rows != None else numRows
+        self.rowSetCache = None
+        self.rowArrayCache = None
+
+    # Build from an iterable of models (each a set of atoms or atom names).
+    @staticmethod
+    def fromModels(objects, models, atoms=None):
+        models = [set(map(str, model)) for model in models]
+        if atoms == None:
+            atoms = sorted(set(atom for model in models for atom in model))
+        modelSet = ModelSet(map(str, objects), atoms, rows=[])
+        modelSet.rows = sorted(set(modelSet.encode(model) for model in models))
+        modelSet.numRows = len(modelSet.rows)
+        return modelSet
+
+    def __len__(self): return self.numRows
+
+    # Return the row of |model| (a set of atoms or atom names), or None if the
+    # model uses an atom outside of the atom table.
+    def encode(self, model):
+        row = 0
+        for atom in model:
+            i = self.atomIndex.get(str(atom))
+            if i == None: return None
+            row |= 1 << i
+        return row
+
+    # Return the atom names that are true in |row|.
+    def decode(self, row):
+        return [atom for i, atom in enumerate(self.atoms) if row >> i & 1]
+
+    # All rows as a sorted list of ints, read from the memory map on first use.
+    def allRows(self):
+        if self.rows == None:
+            if np != None:
+                self.rows = self.toInts(self.rowArray())
+            else:
+                rowBytes = 8 * self.wordsPerRow
+                view = memoryview(self.buffer)[self.offset:self.offset + rowBytes * self.numRows]
+                self.rows = [int.from_bytes(view[i:i + rowBytes], 'little')
+                             for i in range(0, len(view), rowBytes)]
+                view.release()
+        return self.rows
+
+    # All rows as a (numRows, wordsPerRow) uint64 array (NumPy only); a view of
+    # the memory map for a loaded file.
+    def rowArray(self):
+        if self.rowArrayCache is None:
+            if self.rows == None:
+                array = np.frombuffer(self.buffer, dtype='<u8', count=self.numRows * self.wordsPerRow,
+                                      offset=self.offset)
+            else:
+                mask = (1 << 64) - 1
+                array = np.array([row >> (64 * k) & mask for row in self.rows for k in range(self.wordsPerRow)],
+                                 dtype='<u8')
+            self.rowArrayCache = array.reshape(self.numRows, self.wordsPerRow)
+        return self.rowArrayCache
+
+    # Rows of a uint64 array as a list of ints.
+    def toInts(self, array):
+        if self.wordsPerRow == 1: return array[:, 0].tolist()
+        rows = array[:, -1].astype(object)
+        for k in range(self.wordsPerRow - 2, -1, -1):
+            rows = rows << 64 | array[:, k].astype(object)
+        return rows.tolist()
+
+    # All rows as a (numRows, len(atoms)) boolean array (NumPy only): column i
+    # is whether atoms[i] is true in each model.
+    def bitMatrix(self):
+        bits = np.unpackbits(self.rowArray().view(np.uint8), axis=1, bitorder='little')
+        return bits[:, :len(self.atoms)].view(bool)
+
+    # Return the column of |atom| in |bits| = bitMatrix() (all False if it is
+    # not in the atom table).
+    def column(self, bits, atom):
+        i = self.atomIndex.get(str(atom))
+        if i == None: return np.zeros(self.numRows, dtype=bool)
+        return bits[:, i]
+
+    # Return the rows of |other| in our atom table as a uint64 array (NumPy
+    # only), dropping the ones that use an atom we don't have.
+    def translate(self, other):
+        bits = other.bitMatrix()
+        ours = [self.atomIndex.get(atom) for atom in other.atoms]
+        unknown = [j for j, i in enumerate(ours) if i == None]
+        known = [j for j, i in enumerate(ours) if i != None]
+        if unknown: bits = bits[~bits[:, unknown].any(axis=1)]
+        translated = np.zeros((len(bits), 64 * self.wordsPerRow), dtype=bool)
+        translated[:, [ours[j] for j in known]] = bits[:, known]
+        return np.packbits(translated, axis=1, bitorder='little').view('<u8')
+
+    def rowSet(self):
+        if self.rowSetCache == None: self.rowSetCache = set(self.allRows())
+        return self.rowSetCache
+
+    def __contains__(self, model):
+        row = model if isinstance(model, int) else self.encode(model)
+        return row != None and row in self.rowSet()
+
+    # Return the rows (in the atom table of |self|) that are not in |other|.
+    def difference(self, other):
+        if np != None:
+            rows = self.rowArray()
+            otherRows = other.rowArray() if other.atoms == self.atoms else self.translate(other)
+            # Sort all the rows together (most significant word first, ours
+            # before equal ones of |other|): since our rows are unique, one of
+            # them is in |other| iff the next row is the same.
+            allRows = np.concatenate([rows, otherRows])
+            theirs = np.arange(len(allRows)) >= len(rows)
+            order = np.lexsort([theirs] + [allRows[:, k] for k in range(self.wordsPerRow)])
+            allRows, theirs = allRows[order], theirs[order]
+            nextSame = np.append((allRows[1:] == allRows[:-1]).all(axis=1), False)
+            return self.toInts(allRows[~theirs & ~nextSame])
+        if other.atoms == self.atoms:
+            return sorted(self.rowSet() - other.rowSet())
+        # Different atom tables: translate the other rows into ours first
+        otherRows = set()
+        for row in other.allRows():
+            translated = self.encode(other.decode(row))
+            if translated != None: otherRows.add(translated)
+        return sorted(self.rowSet() - otherRows)
+
+    def save(self, path):
+        objects = '\n'.join(self.objects).encode('utf-8')
+        atoms = '\n'.join(self.atoms).encode('utf-8')
+        rowBytes = 8 * self.wordsPerRow
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(self.atoms), self.wordsPerRow, self.numRows))
+            for names in (objects, atoms):
+                f.write(LENGTH.pack(len(names)))
+                f.write(names)
+            f.write(b'\0' * (-f.tell() % 8))
+            if np != None:
+                f.write(self.rowArray().tobytes())
+            else:
+                for row in self.allRows():
+                    f.write(row.to_bytes(rowBytes, 'little'))
+
+    # Load |path|; the rows stay in a memory map until they are needed.
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            if f.seek(0, 2) == 0: raise Exception('Empty model set file: %s' % path)
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, numAtoms, wordsPerRow, numRows = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC: raise Exception('Not a model set file: %s' % path)
+        offset = HEADER.size
+        names = []
+        for _ in range(2):
+            (length,) = LENGTH.unpack_from(buffer, offset)
+            offset += LENGTH.size
+            text = buffer[offset:offset + length].decode('utf-8')
+            names.append(text.split('\n') if text else [])
+            offset += length
+        offset += -offset % 8
+        objects, atoms = names
+        if len(atoms) != numAtoms: raise Exception('Corrupt atom table: %s' % path)
+        return ModelSet(objects, atoms, buffer=buffer, offset=offset, numRows=numRows)
+
+# Load (objects, targetModels) from a gzip-pickled models/*.pklz file.
+def loadPklz(path):
+    with gzip.open(path) as f:
+        objects, models = pickle.load(f)
+    return ModelSet.fromModels(objects, models)
+
+# Convert a models/*.pklz file into the compact format.
+def convertPklz(pklzPath, outPath):
+    modelSet = loadPklz(pklzPath)
+    modelSet.save(outPath)
+    return modelSet
+
+# Usage: python modelset.py models/1a.pklz [models/1b.pklz ...]
+# Writes models/1a.lms next to each input.
+if __name__ == '__main__':
+    import sys
+    for pklzPath in sys.argv[1:]:
+        outPath = pklzPath[:-len('.pklz')] + '.lms' if pklzPath.endswith('.pklz') else pklzPath + '.lms'
+        modelSet = convertPklz(pklzPath, outPath)
+        print('%s: %d models over %d atoms => %s' % (pklzPath, len(modelSet), len(modelSet.atoms), outPath))
@@ -0,0 +1,120 @@
+# Evaluation of first-order formulas on a model over a finite domain, without
+# grounding them first.
+#
+# Every k-ary predicate is a boolean tensor of shape (n,) * k over the n objects
+# (entry [i, j] of Parent is whether Parent(objects[i], objects[j]) is true).
+# A subformula evaluates to a tensor with one axis per free variable, so
+# And/Or/Implies/Not are elementwise operations (with broadcasting) and
+# Forall/Exists are all/any reductions along the axis of the bound variable.
+#
+# NumPy is optional: without it, checkModel falls back to propositionalize.
+
+from logic import *
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# A model (set of true atoms) as one tensor per predicate.
+class TensorModel:
+    # objects: the domain, as in propositionalize (names or Constants)
+    # model: set of true atoms, whose arguments are all objects
+    def __init__(self, objects, model=()):
+        if np == None: raise Exception('TensorModel requires NumPy')
+        self.objects = [toExpr(obj) for obj in objects]
+        self.objectIndex = dict((obj, i) for i, obj in enumerate(self.objects))
+        self.tensors = {}  # (predicate name, arity) => tensor
+        for atom in model:
+            self.tensor(atom.name, len(atom.args))[tuple(self.index(arg) for arg in atom.args)] = True
+
+    def index(self, obj):
+        if obj not in self.objectIndex: raise Exception('Not an object of the domain: %s' % obj)
+        return self.objectIndex[obj]
+
+    # Return the tensor of predicate |name| (all False if no atom of it is true).
+    def tensor(self, name, arity):
+        key = (name, arity)
+        if key not in self.tensors:
+            n = len(self.objects)
+            if name == 'Equals' and arity == 2: self.tensors[key] = np.eye(n, dtype=bool)
+            else: self.tensors[key] = np.zeros((n,) * arity, dtype=bool)
+        return self.tensors[key]
+
+    # Return the tensor of |form| and the free variables of its axes (in order).
+    # Free variables must appear in |bound| (the enclosing quantifiers).
+    def evaluate(self, form, bound):
+        if form.isa(Atom):
+            variables = []
+            for arg in form.args:
+                if arg.isa(Variable) and arg not in variables:
+                    if arg not in bound: raise Exception("Free variable found: %s" % arg)
+                    variables.append(arg)
+            # Index every argument: a constant picks one entry, a variable
+            # ranges over the axis of its position in |variables|, so repeated
+            # variables select a diagonal.
+            n = len(self.objects)
+            index = []
+            for arg in form.args:
+                if arg.isa(Variable):
+                    shape = [1] * len(variables)
+                    shape[variables.index(arg)] = n
+                    index.append(np.arange(n).reshape(shape))
+                else:
+                    index.append(self.index(arg))
+            tensor = self.tensor(form.name, len(form.args))
+            return np.asarray(tensor[tuple(index)] if index else tensor), variables
+        if form.isa(Not):
+            tensor, variables = self.evaluate(form.arg, bound)
+            return ~tensor, variables
+        if form.isa(And): return self.combine(np.logical_and, form.arg1, form.arg2, bound)
+        if form.isa(Or): return self.combine(np.logical_or, form.arg1, form.arg2, bound)
+        if form.isa(Implies):
+            return self.combine(lambda a, b: np.logical_or(~a, b), form.arg1, form.arg2, bound)
+        if form.isa(Clause):
+            result = self.evaluate(form.literals[0], bound)
+            for item in form.literals[1:]:
+                result = self.align(np.logical_or, result, self.evaluate(item, bound))
+            return result
+        if form.isa(Exists) or form.isa(Forall):
+            tensor, variables = self.evaluate(form.body, bound + [form.var])
+            if form.var in variables:
+                axis = variables.index(form.var)
+                variables = variables[:axis] + variables[axis+1:]
+            else:  # Still quantify over the (possibly empty) domain
+                tensor = np.broadcast_to(tensor[..., None], tensor.shape + (len(self.objects),))
+                axis = tensor.ndim - 1
+            reduce = np.any if form.isa(Exists) else np.all
+            return reduce(tensor, axis=axis), variables
+        raise Exception("Unhandled: %s" % form)
+
+    def combine(self, op, form1, form2, bound):
+        return self.align(op, self.evaluate(form1, bound), self.evaluate(form2, bound))
+
+    # Apply |op| to two (tensor, variables) results, matching up their axes.
+    def align(self, op, result1, result2):
+        (tensor1, variables1), (tensor2, variables2) = result1, result2
+        variables = variables1 + [var for var in variables2 if var not in variables1]
+        def expand(tensor, tensorVariables):
+            # Move the axes into the order of |variables|, size 1 for the missing ones
+            order = [var for var in variables if var in tensorVariables]
+            tensor = np.transpose(tensor, [tensorVariables.index(var) for var in order])
+            return tensor.reshape([tensor.shape[order.index(var)] if var in order else 1 for var in variables])
+        return op(expand(tensor1, variables1), expand(tensor2, variables2)), variables
+
+    # Return whether the closed formula |form| is true.
+    def interpret(self, form):
+        if form == AtomTrue or form == AtomFalse: return form
+        tensor, variables = self.evaluate(form, [])
+        return bool(tensor)
+
+# Return whether |model| (a set of true atoms) satisfies all of |forms|, where
+# the quantifiers range over |objects|.  Same answer as
+# interpretForms(propositionalize(forms, objects), model).
+def checkModel(forms, model, objects):
+    if np == None:
+        newForms = [universalInterpret(form) for form in propositionalize(forms, objects)]
+        if AtomFalse in newForms: return False
+        return interpretForms([form for form in newForms if form != AtomTrue], model)
+    tensorModel = TensorModel(objects, model)
+    return all(tensorModel.interpret(form) for form in forms)